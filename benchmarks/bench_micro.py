@@ -0,0 +1,90 @@
+"""
+Микробенчмарки форм и шаблонных тегов (без обращений к БД).
+
+    pytest benchmarks/bench_micro.py --benchmark-json=benchmarks/results/micro-$(git rev-parse --short HEAD).json
+
+Сравнение двух запусков: pytest-benchmark compare <файл1> <файл2>
+"""
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from django.conf import settings  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from catalog.forms import CategoryForm, ContactForm  # noqa: E402
+from catalog.media import media_url  # noqa: E402
+from catalog.models import Category, Product  # noqa: E402
+from catalog.paginators import KeysetPaginator  # noqa: E402
+from catalog.templatetags.media_tag import media_tag  # noqa: E402
+
+
+def test_category_form_valid(benchmark):
+    data = {'name': 'Напитки', 'description': 'Чай, кофе и соки'}
+    assert benchmark(lambda: CategoryForm(data).is_valid())
+
+
+def test_category_form_forbidden_word(benchmark):
+    data = {'name': 'казино', 'description': 'Описание'}
+    assert not benchmark(lambda: CategoryForm(data).is_valid())
+
+
+def test_contact_form(benchmark):
+    data = {'name': 'Иван', 'phone': '+7 900 000-00-00', 'message': 'Здравствуйте'}
+    assert benchmark(lambda: ContactForm(data).is_valid())
+
+
+def first_media_file():
+    images = sorted((Path(settings.MEDIA_ROOT) / 'img').glob('*.jpg'))
+    if not images:
+        pytest.skip('в MEDIA_ROOT/img нет изображений')
+    return f'img/{images[0].name}'
+
+
+def test_media_tag_cached(benchmark):
+    name = first_media_file()
+    media_url.clear()
+    media_tag(name)
+    benchmark(media_tag, name)
+
+
+def test_media_tag_uncached(benchmark):
+    name = first_media_file()
+
+    def resolve():
+        media_url.clear()
+        return media_tag(name)
+
+    benchmark(resolve)
+
+
+def test_media_tag_missing_thumbnail(benchmark):
+    # Ссылка на оригинал вместо несозданной миниатюры не кэшируется
+    benchmark(media_tag, 'img/missing.jpg', 320, 'webp')
+
+
+def test_product_card_template(benchmark):
+    template = Template(
+        "{% load media_tag %}{% for object in object_list %}"
+        "<picture><source srcset=\"{% media_tag object.image 320 'webp' %}\">"
+        "<img src=\"{% media_tag object.image 320 %}\"></picture>"
+        "<p>{{ object|title }}</p><p>{{ object.description|truncatechars:100 }}</p>"
+        "{% endfor %}"
+    )
+    category = Category(pk=1, name='Напитки')
+    products = [
+        Product(pk=number, name=f'Товар {number}', description='Описание ' * 30, category=category,
+                image=f'img/{number}.jpg')
+        for number in range(12)
+    ]
+    context = Context({'object_list': products})
+    benchmark(template.render, context)
+
+
+def test_keyset_cursor_roundtrip(benchmark):
+    paginator = KeysetPaginator(Product.objects.none(), 12)
+    product = Product(pk=42, date_created=timezone.now())
+    benchmark(lambda: paginator.decode_cursor(paginator.encode_cursor(product)))
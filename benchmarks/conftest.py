@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+import django
+
+# Микробенчмарки запускаются pytest'ом из корня проекта: pytest benchmarks/bench_micro.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
@@ -0,0 +1,232 @@
+"""
+Нагрузочный тест витрины на asyncio без сторонних зависимостей.
+
+Подготовка и запуск (SQLite или локальный PostgreSQL):
+
+    DJANGO_DB=sqlite python manage.py migrate
+    DJANGO_DB=sqlite python manage.py generate_data
+    DJANGO_DB=sqlite python manage.py runserver --noreload
+    python benchmarks/load.py --duration 30 --concurrency 20
+
+Результат сохраняется в benchmarks/results/load-<коммит>.json; с --baseline
+выводится изменение p50/p99 и пропускной способности относительно прошлого запуска.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+# Сценарий -> вес при случайном выборе
+SCENARIOS = {
+    'list_product': 30,
+    'view_product': 25,
+    'list_category': 10,
+    'list_material': 15,
+    'view_material': 15,
+    'login': 5,
+}
+
+PRODUCT_LINK_RE = re.compile(r'/view_product/(\d+)')
+MATERIAL_LINK_RE = re.compile(r'/materials/view_material/(\d+)/')
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def cookies(self):
+        return dict(
+            value.split(';', 1)[0].split('=', 1)
+            for name, value in self.headers if name == 'set-cookie'
+        )
+
+
+async def request(host, port, method, path, body=b'', headers=None):
+    """Один HTTP/1.1-запрос с Connection: close"""
+    reader, writer = await asyncio.open_connection(host, port)
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close',
+             f'Content-Length: {len(body)}']
+    lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    head, _, content = raw.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = [
+        (name.strip().lower(), value.strip())
+        for name, _, value in (line.partition(':') for line in header_lines)
+    ]
+    return Response(int(status_line.split()[1]), headers, content)
+
+
+class LoadTest:
+
+    def __init__(self, options):
+        self.host = options.host
+        self.port = options.port
+        self.users = options.users
+        self.password = options.password
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.product_ids = []
+        self.material_ids = []
+
+    async def discover(self):
+        """Берёт идентификаторы товаров и материалов со страниц списков"""
+        products = await request(self.host, self.port, 'GET', '/')
+        materials = await request(self.host, self.port, 'GET', '/materials/?order=popular')
+        self.product_ids = PRODUCT_LINK_RE.findall(products.body.decode())
+        self.material_ids = MATERIAL_LINK_RE.findall(materials.body.decode())
+        if not self.product_ids or not self.material_ids:
+            raise SystemExit('Нет товаров или материалов: сначала выполните manage.py generate_data')
+
+    def path(self, scenario):
+        if scenario == 'list_product':
+            return '/'
+        if scenario == 'view_product':
+            return f'/view_product/{random.choice(self.product_ids)}'
+        if scenario == 'list_category':
+            return '/list_category/'
+        if scenario == 'list_material':
+            return f'/materials/?page={random.randint(1, 5)}'
+        return f'/materials/view_material/{random.choice(self.material_ids)}/'
+
+    async def login(self):
+        """Вход пользователя из generate_data; время меряется только для POST"""
+        form = await request(self.host, self.port, 'GET', '/users/')
+        csrf_token = CSRF_INPUT_RE.search(form.body.decode()).group(1)
+        cookie = form.cookies()['csrftoken']
+        body = urlencode({
+            'csrfmiddlewaretoken': csrf_token,
+            'username': f'bench{random.randrange(self.users)}@example.com',
+            'password': self.password,
+        }).encode()
+        started = time.perf_counter()
+        response = await request(self.host, self.port, 'POST', '/users/', body, {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Cookie': f'csrftoken={cookie}',
+        })
+        return time.perf_counter() - started, response.status == 302
+
+    async def hit(self, scenario):
+        if scenario == 'login':
+            return await self.login()
+        started = time.perf_counter()
+        response = await request(self.host, self.port, 'GET', self.path(scenario))
+        return time.perf_counter() - started, response.status == 200
+
+    async def worker(self, deadline):
+        scenarios, weights = zip(*SCENARIOS.items())
+        while time.monotonic() < deadline:
+            scenario = random.choices(scenarios, weights)[0]
+            try:
+                latency, ok = await self.hit(scenario)
+            except (OSError, AttributeError, KeyError, IndexError):
+                latency, ok = None, False
+            if ok:
+                self.latencies[scenario].append(latency)
+            else:
+                self.errors[scenario] += 1
+
+    async def run(self, duration, concurrency):
+        await self.discover()
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(self.worker(deadline) for _ in range(concurrency)))
+        return self.summary(duration)
+
+    def summary(self, duration):
+        result = {}
+        for scenario in SCENARIOS:
+            latencies = self.latencies[scenario]
+            errors = self.errors[scenario]
+            if not latencies and not errors:
+                continue
+            # Сценарий без успешных ответов тоже попадает в отчёт: иначе ошибки не видны.
+            # Для перцентилей нужно хотя бы два замера, единственный замер берём как есть
+            if len(latencies) >= 2:
+                percentiles = [statistics.quantiles(latencies, n=100)[index] for index in (49, 89, 98)]
+            else:
+                percentiles = latencies * 3 or [None] * 3
+            result[scenario] = {
+                'requests': len(latencies),
+                'errors': errors,
+                'rps': round(len(latencies) / duration, 2),
+                **{
+                    f'p{level}_ms': None if value is None else round(value * 1000, 2)
+                    for level, value in zip((50, 90, 99), percentiles)
+                },
+            }
+        return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_report(scenarios, baseline=None):
+    print(f'{"сценарий":<15} {"rps":>8} {"p50, мс":>9} {"p99, мс":>9} {"ошибки":>7}')
+    for scenario, stats in scenarios.items():
+        p50, p99 = ('—' if stats[key] is None else stats[key] for key in ('p50_ms', 'p99_ms'))
+        line = f'{scenario:<15} {stats["rps"]:>8} {p50:>9} {p99:>9} {stats["errors"]:>7}'
+        previous = (baseline or {}).get(scenario)
+        if previous:
+            changes = (
+                f'{key} {(stats[key] - previous[key]) / previous[key] * 100:+.1f}%'
+                for key in ('rps', 'p50_ms', 'p99_ms') if previous.get(key) and stats[key] is not None
+            )
+            line += '   ' + ', '.join(changes)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--duration', type=float, default=30, help='Длительность, секунд')
+    parser.add_argument('--concurrency', type=int, default=20, help='Одновременных виртуальных пользователей')
+    parser.add_argument('--users', type=int, default=100, help='Сколько пользователей создал generate_data')
+    parser.add_argument('--password', default='bench-password')
+    parser.add_argument('--output', type=Path, help='Файл результата (по умолчанию results/load-<коммит>.json)')
+    parser.add_argument('--baseline', type=Path, help='Результат прошлого запуска для сравнения')
+    options = parser.parse_args()
+
+    scenarios = asyncio.run(LoadTest(options).run(options.duration, options.concurrency))
+    commit = git_commit()
+    result = {
+        'commit': commit,
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+        'duration': options.duration,
+        'concurrency': options.concurrency,
+        'scenarios': scenarios,
+    }
+    output = options.output or RESULTS_DIR / f'load-{commit}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+
+    baseline = json.loads(options.baseline.read_text())['scenarios'] if options.baseline else None
+    print_report(scenarios, baseline)
+    print(f'Результат: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,57 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.template.response import TemplateResponse
 
 from catalog.models import Category, Product, Version, Contacts
+from catalog.paginators import EstimatedCountPaginator
+from catalog.services import PRODUCT_BULK_ACTIONS, SET_CATEGORY_PERM, SET_PUBLICATION_PERM, bulk_update_products, \
+    search_products
 from users.models import User
 
 
 # from users.models import User
 
 
+class RankedSearchChangeList(ChangeList):
+    """
+    ChangeList, в котором результаты поиска отсортированы по релевантности,
+    пока пользователь сам не выбрал столбец для сортировки.
+
+    Стандартный get_ordering ставит сортировку админки впереди сортировки
+    queryset и перебил бы релевантность.
+    """
+
+    def get_ordering(self, request, queryset):
+        if self.query and not self.params.get(ORDER_VAR):
+            return list(queryset.query.order_by)
+        return super().get_ordering(request, queryset)
+
+
+class RankedSearchMixin:
+    """Поиск в админке через полнотекстовый индекс с сортировкой по релевантности"""
+    # search_products / search_materials: (запрос, queryset) -> queryset
+    search_function = None
+
+    def get_changelist(self, request, **kwargs):
+        return RankedSearchChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тому же индексу, что и на сайте, вместо icontains по каждому полю
+        if not search_term:
+            return queryset, False
+        results = self.search_function(search_term, queryset)
+        if request.GET.get(ORDER_VAR) and queryset.query.order_by:
+            # Сортировка по выбранному столбцу уже применена (Django 5.x сортирует
+            # до поиска): order_by поиска её бы заменил
+            results = results.order_by(*queryset.query.order_by)
+        return results, False
+
+
+class BulkCategoryForm(forms.Form):
+    category = forms.ModelChoiceField(Category.objects.only('name'), label='Категория')
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'description',)
@@ -14,15 +59,67 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(RankedSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'price', 'category',)
+    list_select_related = ('category',)
     list_filter = ('category',)
     search_fields = ('name', 'description')
+    # Без COUNT(*) по всей таблице на каждую загрузку списка
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    search_function = staticmethod(search_products)
+
+    # Массовые действия выполняются UPDATE пачками (services.bulk_update_products),
+    # поэтому «выбрать все» с фильтром по категории обрабатывает её целиком за один запрос
+
+    def has_publication_permission(self, request):
+        return request.user.has_perm(SET_PUBLICATION_PERM)
+
+    def has_category_permission(self, request):
+        return request.user.has_perm(SET_CATEGORY_PERM)
+
+    def run_bulk_action(self, request, queryset, action, **values):
+        updated = bulk_update_products(queryset, **PRODUCT_BULK_ACTIONS[action][1], **values)
+        self.message_user(request, f'Обновлено товаров: {updated}', messages.SUCCESS)
+
+    @admin.action(description='Опубликовать', permissions=['publication'])
+    def publish(self, request, queryset):
+        self.run_bulk_action(request, queryset, 'publish')
+
+    @admin.action(description='Снять с публикации', permissions=['publication'])
+    def unpublish(self, request, queryset):
+        self.run_bulk_action(request, queryset, 'unpublish')
+
+    @admin.action(description='Переключить наличие', permissions=['change'])
+    def toggle_active(self, request, queryset):
+        self.run_bulk_action(request, queryset, 'toggle_active')
+
+    @admin.action(description='Перенести в категорию', permissions=['category'])
+    def set_category(self, request, queryset):
+        form = BulkCategoryForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            self.run_bulk_action(request, queryset, 'set_category', category=form.cleaned_data['category'])
+            return None
+        return TemplateResponse(request, 'admin/catalog/product/set_category.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Перенести в категорию',
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            'selected': request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    actions = [publish, unpublish, toggle_active, set_category]
 
 
 @admin.register(Version)
 class VersionAdmin(admin.ModelAdmin):
     list_display = ('version_name', 'version_number', 'product', 'is_current')
+    list_select_related = ('product',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 admin.site.register(User)
@@ -1,6 +1,32 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Бэкенды, данные которых видит только текущий процесс
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_caches():
+    """
+    Вне DEBUG не даёт запуститься с кэшами из SHARED_CACHES в памяти процесса:
+    каждый воркер видел бы свои версии прав, сессии и счётчики
+    """
+    if settings.DEBUG:
+        return
+    local = [alias for alias in settings.SHARED_CACHES if settings.CACHES[alias]['BACKEND'] in LOCAL_CACHE_BACKENDS]
+    if local:
+        raise ImproperlyConfigured(
+            f'Кэши {", ".join(local)} должны быть общими для всех воркеров: задайте REDIS_URL'
+        )
 
 
 class CatalogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "catalog"
+
+    def ready(self):
+        import catalog.signals  # noqa: F401
+        check_shared_caches()
@@ -1,6 +1,8 @@
 from django import forms
+from django.contrib.postgres.forms import SimpleArrayField
 
-from catalog.models import Product, Category, Version, VersionCategory
+from catalog.models import Product, Category, Version, VersionCategory, Contacts
+from catalog.services import PRODUCT_BULK_ACTIONS
 
 
 class StyleFormMixin:
@@ -17,6 +19,11 @@ class ProductForm(StyleFormMixin, forms.ModelForm):
         model = Product
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Для списка категорий достаточно названия
+        self.fields['category'].queryset = Category.objects.only('name')
+
     def clean_name(self):
         cleaned_data = self.cleaned_data.get('name')
         if cleaned_data.lower() in self.forbidden_words:
@@ -50,6 +57,28 @@ class CategoryForm(StyleFormMixin, forms.ModelForm):
         return cleaned_data
 
 
+class CurrentVersionFormSet(forms.BaseInlineFormSet):
+    """Формсет версий, в котором текущей может быть отмечена только одна версия"""
+
+    def clean(self):
+        super().clean()
+        current = [
+            form for form in self.forms
+            if form.cleaned_data.get('is_current') and not self._should_delete_form(form)
+        ]
+        if len(current) > 1:
+            raise forms.ValidationError('Текущей может быть только одна версия')
+
+    def get_queryset(self):
+        # Версии со ссылкой на владельца одним запросом
+        if not hasattr(self, '_queryset'):
+            self._queryset = super().get_queryset().select_related(self.fk.name)
+        return self._queryset
+
+
+# Формы версий используются только в inline-формсетах: поле владельца там
+# заменяется скрытым InlineForeignKeyField, которое не выводит список записей
+# и отклоняет чужой pk
 class VersionForm(forms.ModelForm):
     class Meta:
         model = Version
@@ -70,4 +99,55 @@ class VersionCategoryForm(forms.ModelForm):
 class ProductModeratorForm(forms.ModelForm):
     class Meta:
         model = Product
-        fields = ('description', 'category', 'is_published',)
\ No newline at end of file
+        fields = ('description', 'category', 'is_published',)
+
+
+class ProductBulkForm(forms.Form):
+    """Массовое действие: над товарами из ids (1,2,3) или над всеми товарами category"""
+    action = forms.ChoiceField(choices=[(name, name) for name in PRODUCT_BULK_ACTIONS])
+    ids = SimpleArrayField(forms.IntegerField(min_value=1), required=False)
+    category = forms.ModelChoiceField(Category.objects.only('pk'), required=False)
+    target_category = forms.ModelChoiceField(Category.objects.only('pk'), required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('ids') and not cleaned_data.get('category'):
+            raise forms.ValidationError('Укажите товары (ids) или категорию (category)')
+        if cleaned_data.get('action') == 'set_category' and not cleaned_data.get('target_category'):
+            self.add_error('target_category', 'Обязательное поле для set_category')
+        return cleaned_data
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        if self.cleaned_data['ids']:
+            queryset = queryset.filter(pk__in=self.cleaned_data['ids'])
+        if self.cleaned_data['category']:
+            queryset = queryset.filter(category=self.cleaned_data['category'])
+        return queryset
+
+    def get_values(self):
+        values = dict(PRODUCT_BULK_ACTIONS[self.cleaned_data['action']][1])
+        if self.cleaned_data['action'] == 'set_category':
+            values['category'] = self.cleaned_data['target_category']
+        return values
+
+
+class ContactForm(forms.ModelForm):
+    class Meta:
+        model = Contacts
+        fields = ('name', 'phone', 'message',)
+
+    def clean_phone(self):
+        return ''.join(self.cleaned_data.get('phone').split())
+
+    def validate_unique(self):
+        # Повторное обращение с того же телефона не ошибка: запись
+        # обновляется при сбросе буфера (INSERT ... ON CONFLICT)
+        pass
+
+
+# Классы формсетов строятся один раз при импорте, а не на каждый запрос
+VersionFormSet = forms.inlineformset_factory(Product, Version, form=VersionForm, formset=CurrentVersionFormSet,
+                                             extra=1)
+VersionCategoryFormSet = forms.inlineformset_factory(Category, VersionCategory, form=VersionCategoryForm,
+                                                     formset=CurrentVersionFormSet, extra=1)
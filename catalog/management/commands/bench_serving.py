@@ -0,0 +1,132 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from catalog.models import Category, Product
+from materials.models import Material
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и p99 страниц каталога в трёх режимах: '
+        'WSGI, ASGI с синхронными и ASGI с асинхронными представлениями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на страницу в каждом режиме')
+        parser.add_argument('--concurrency', type=int, default=10, help='Одновременных запросов')
+
+    def handle(self, *args, **options):
+        self.requests = options['requests']
+        self.concurrency = options['concurrency']
+        pages = self.get_pages()
+
+        self.stdout.write(f'{"режим":<12} {"страница":<18} {"rps":>8} {"p50, мс":>9} {"p99, мс":>9} {"ошибки":>7}')
+        # Кэш готовых страниц отключаем: сравниваем режимы запуска, а не попадания в кэш
+        with override_settings(DETAIL_RESPONSE_CACHE_TIMEOUT=0):
+            wsgi, asgi = WSGIHandler(), ASGIHandler()
+            for name, sync_path, async_path in pages:
+                self.report('wsgi', name, self.run_wsgi(wsgi, sync_path))
+                self.report('asgi-sync', name, asyncio.run(self.run_asgi(asgi, sync_path)))
+                self.report('asgi-async', name, asyncio.run(self.run_asgi(asgi, async_path)))
+
+    def get_pages(self):
+        product = Product.objects.filter(is_active=True).only('pk').first()
+        category = Category.objects.only('pk').first()
+        material = Material.objects.filter(is_published=True).only('pk').first()
+        if product is None or category is None or material is None:
+            raise CommandError('Нужны товары, категории и материалы: выполните manage.py generate_data')
+        return [
+            ('products', reverse('catalog:list_product'), reverse('catalog:async_list_product')),
+            ('product', reverse('catalog:view_product', args=[product.pk]),
+             reverse('catalog:async_view_product', args=[product.pk])),
+            ('categories', reverse('catalog:list_category'), reverse('catalog:async_list_category')),
+            ('category', reverse('catalog:view_category', args=[category.pk]),
+             reverse('catalog:async_view_category', args=[category.pk])),
+            ('materials', reverse('materials:list_material'), reverse('materials:async_list_material')),
+            ('material', reverse('materials:view_material', args=[material.pk]),
+             reverse('materials:async_view_material', args=[material.pk])),
+        ]
+
+    def run_wsgi(self, handler, path):
+        def call():
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': '',
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': BytesIO(),
+                'wsgi.errors': self.stderr,
+                'wsgi.url_scheme': 'http',
+            }
+            statuses = []
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: statuses.append(status))
+            b''.join(response)
+            response.close()
+            return time.perf_counter() - started, statuses[0].startswith('200')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            results = list(executor.map(lambda _: call(), range(self.requests)))
+        return results, time.perf_counter() - started
+
+    async def run_asgi(self, handler, path):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def call():
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'root_path': '',
+                'query_string': b'',
+                'headers': [(b'host', b'localhost')],
+                'client': ('127.0.0.1', 0),
+                'server': ('localhost', 80),
+            }
+            statuses = []
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                # Клиент не отключается: Django отменит ожидание после ответа
+                await asyncio.Future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                return time.perf_counter() - started, statuses[0] == 200
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(self.requests)))
+        return results, time.perf_counter() - started
+
+    def report(self, mode, name, run):
+        results, elapsed = run
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f'{mode:<12} {name:<18} {len(results) / elapsed:>8.1f} '
+            f'{percentiles[49] * 1000:>9.2f} {percentiles[98] * 1000:>9.2f} {errors:>7}'
+        )
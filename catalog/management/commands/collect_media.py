@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.management import BaseCommand, CommandError
+
+from catalog.storage import ContentAddressedStorage, collect_orphans
+
+
+class Command(BaseCommand):
+    help = 'Удаляет медиафайлы, на которые не ссылается ни одна запись'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-period', type=int, default=settings.MEDIA_GC_GRACE_PERIOD,
+                            help='не трогать файлы моложе стольких секунд')
+        parser.add_argument('--dry-run', action='store_true', help='только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        storage = storages['default']
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError('В STORAGES["default"] должно быть указано catalog.storage.ContentAddressedStorage')
+        removed = collect_orphans(storage, options['grace_period'], dry_run=options['dry_run'])
+        for name in removed:
+            self.stdout.write(name)
+        self.stdout.write(f'Удалено файлов: {len(removed)}')
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.storage import HASHED_NAME_RE, MEDIA_FIELDS, ContentAddressedStorage
+from catalog.thumbnails import RENDITION_FORMATS, delete_renditions
+from users.backends import invalidate_user_permissions
+
+RENDITION_RE = re.compile(r'\.\d+\.(%s)$' % '|'.join(RENDITION_FORMATS))
+
+
+class Command(BaseCommand):
+    help = 'Переносит существующие медиафайлы в хранилище по содержимому, удаляя дубликаты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='только показать, что будет сделано')
+
+    def handle(self, *args, **options):
+        storage = storages['default']
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError('В STORAGES["default"] должно быть указано catalog.storage.ContentAddressedStorage')
+        self.dry_run = options['dry_run']
+        moved = removed = 0
+        targets = set()
+        for name in self.find_legacy_files(storage):
+            new_name = storage.hashed_name(os.path.dirname(name), self.file_digest(storage, name),
+                                           os.path.splitext(name)[1])
+            duplicate = new_name in targets or storage.exists(new_name)
+            targets.add(new_name)
+            self.stdout.write(f'{name} -> {new_name}' + (' (дубликат)' if duplicate else ''))
+            if self.dry_run:
+                continue
+            # Файл копируется до транзакции, а старый удаляется только после
+            # фиксации: при откате ссылки остаются рабочими, а лишнюю копию
+            # уберёт collect_media
+            if duplicate:
+                os.utime(storage.path(new_name))
+            else:
+                self.copy(storage, name, new_name)
+            with transaction.atomic():
+                self.relink(name, new_name)
+                transaction.on_commit(partial(self.remove_legacy, storage, name))
+            removed += duplicate
+            moved += not duplicate
+        self.stdout.write(f'Перенесено: {moved}, удалено дубликатов: {removed}')
+
+    @staticmethod
+    def find_legacy_files(storage):
+        names = []
+        for directory in storage.hashed_directories:
+            root = storage.path(directory)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    name = os.path.relpath(os.path.join(dirpath, filename), storage.location)
+                    name = name.replace(os.sep, '/')
+                    if HASHED_NAME_RE.search(name) or RENDITION_RE.search(name) or name.endswith('.part'):
+                        continue
+                    names.append(name)
+        return sorted(names)
+
+    @staticmethod
+    def copy(storage, name, new_name):
+        directory = os.path.dirname(storage.path(new_name))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        os.close(fd)
+        try:
+            shutil.copyfile(storage.path(name), tmp_path)
+            os.replace(tmp_path, storage.path(new_name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def remove_legacy(storage, name):
+        storage.delete(name)
+        # копии старого имени больше не нужны, новые создаст make_thumbnails
+        delete_renditions(name)
+
+    @staticmethod
+    def file_digest(storage, name, chunk_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with storage.open(name, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def relink(old_name, new_name):
+        """
+        Переписывает ссылки на файл во всех моделях.
+
+        date_modified меняется в том же UPDATE: от него зависят ETag и
+        Last-Modified страниц деталей, ключи их закэшированных ответов и
+        карточек товаров (в том числе товаров изменённой категории), так что
+        ссылки на старый файл нигде не остаются. У пользователя даты изменения
+        нет, поэтому сбрасывается его версия (закэшированный пользователь сессии).
+        """
+        now = timezone.now()
+        for model_label, field_name in MEDIA_FIELDS:
+            model = apps.get_model(model_label)
+            queryset = model._default_manager.filter(**{field_name: old_name})
+            values = {field_name: new_name}
+            if any(field.name == 'date_modified' for field in model._meta.concrete_fields):
+                values['date_modified'] = now
+            elif model._meta.label == settings.AUTH_USER_MODEL:
+                for user_pk in queryset.values_list('pk', flat=True):
+                    transaction.on_commit(partial(invalidate_user_permissions, user_pk))
+            queryset.update(**values)
@@ -0,0 +1,149 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from catalog.management.commands.import_catalog import DERIVED_FIELDS
+from catalog.streaming import COMPRESSION_SUFFIXES, open_text_writer
+
+# Порядок важен: при загрузке категории должны идти раньше товаров
+EXPORT_MODELS = ('catalog.Category', 'catalog.Product', 'catalog.Version', 'catalog.VersionCategory')
+
+
+def init_worker(settings_module):
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    django.setup()
+
+
+@contextmanager
+def export_snapshot():
+    """
+    Транзакция REPEATABLE READ, снимок которой воркеры подключают через
+    SET TRANSACTION SNAPSHOT: все файлы выгрузки соответствуют одному
+    моменту, даже если каталог меняется во время выгрузки.
+
+    Отдаёт идентификатор снимка или None, если СУБД не PostgreSQL или
+    транзакция уже открыта; тогда согласован только однопроцессный режим.
+    """
+    with transaction.atomic():
+        if connection.vendor != 'postgresql' or len(connection.atomic_blocks) > 1:
+            yield None
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+            cursor.execute('SELECT pg_export_snapshot()')
+            yield cursor.fetchone()[0]
+
+
+def export_shard(model_label, pk_from, pk_to, path, fmt, compress, chunk_size, snapshot=None):
+    """Выгружает строки модели с pk в диапазоне [pk_from, pk_to) в один файл"""
+    with transaction.atomic():
+        if snapshot:
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+                cursor.execute('SET TRANSACTION SNAPSHOT %s', [snapshot])
+        return write_shard(apps.get_model(model_label), pk_from, pk_to, path, fmt, compress, chunk_size)
+
+
+def write_shard(model, pk_from, pk_to, path, fmt, compress, chunk_size):
+    # values() вместо сериализатора: без создания объектов модели на каждую строку;
+    # производные поля импорт пересчитывает сам
+    fields = [(field.attname, field.name) for field in model._meta.concrete_fields
+              if not field.primary_key and field.name not in DERIVED_FIELDS]
+    rows = (model.objects.filter(pk__gte=pk_from, pk__lt=pk_to).order_by('pk')
+            .values_list('pk', *(attname for attname, _ in fields)).iterator(chunk_size=chunk_size))
+
+    count = 0
+    with open_text_writer(path, compress) as f:
+        if fmt == 'json':
+            f.write('[')
+        for row in rows:
+            record = {
+                'model': model._meta.label_lower,
+                'pk': row[0],
+                'fields': {name: value for (_, name), value in zip(fields, row[1:])},
+            }
+            if fmt == 'json':
+                f.write(',\n' if count else '\n')
+            f.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False))
+            if fmt == 'ndjson':
+                f.write('\n')
+            count += 1
+        if fmt == 'json':
+            f.write('\n]\n')
+
+    if not count:
+        os.remove(path)
+    return path, count
+
+
+class Command(BaseCommand):
+    help = ('Выгружает каталог в NDJSON/JSON файлы, разбитые по диапазонам pk, параллельно в нескольких '
+            'процессах; на PostgreSQL все процессы читают один снимок БД')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir')
+        parser.add_argument('--format', choices=('ndjson', 'json'), default='ndjson')
+        parser.add_argument('--compress', choices=tuple(COMPRESSION_SUFFIXES), default='none')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--shard-size', type=int, default=100_000,
+                            help='ширина диапазона pk, попадающего в один файл')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='размер пачки при чтении курсором из БД')
+
+    def handle(self, *args, **options):
+        os.makedirs(options['output_dir'], exist_ok=True)
+        # Транзакция со снимком открыта, пока работают воркеры: иначе снимок станет недоступен
+        with export_snapshot() as snapshot:
+            tasks = list(self.make_tasks(options))
+            if options['workers'] <= 1:
+                # Весь экспорт идёт в транзакции export_snapshot
+                results = [export_shard(*task) for task in tasks]
+            else:
+                if snapshot is None:
+                    self.stderr.write('Снимок БД не поддерживается: файлы, выгруженные разными процессами, '
+                                      'могут относиться к разным моментам. Для согласованной выгрузки '
+                                      'используйте --workers 1')
+                results = self.run_workers(tasks, options['workers'], snapshot)
+
+        files = [(path, count) for path, count in results if count]
+        for path, count in files:
+            self.stdout.write(f'{path}: {count}')
+        self.stdout.write(f'Файлов: {len(files)}, записей: {sum(count for _, count in files)}')
+
+    @staticmethod
+    def run_workers(tasks, workers, snapshot):
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(settings.SETTINGS_MODULE,),
+        )
+        with executor:
+            futures = [executor.submit(export_shard, *task, snapshot=snapshot) for task in tasks]
+            try:
+                return [future.result() for future in futures]
+            except Exception as exc:
+                raise CommandError(f'Ошибка выгрузки: {exc}') from exc
+
+    def make_tasks(self, options):
+        extension = options['format'] + COMPRESSION_SUFFIXES[options['compress']]
+        shard_size = options['shard_size']
+        for number, model_label in enumerate(EXPORT_MODELS):
+            model = apps.get_model(model_label)
+            bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+            if bounds['low'] is None:
+                continue
+            for shard, pk_from in enumerate(range(bounds['low'], bounds['high'] + 1, shard_size)):
+                filename = f'{number:02d}-{model._meta.model_name}-{shard:05d}.{extension}'
+                yield (model_label, pk_from, pk_from + shard_size, os.path.join(options['output_dir'], filename),
+                       options['format'], options['compress'], options['chunk_size'])
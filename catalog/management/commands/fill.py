@@ -1,33 +1,8 @@
-import json
-
-from catalog.models import Category, Product
-
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, call_command
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        Category.objects.all().delete()
-        Product.objects.all().delete()
+    help = 'Загружает catalog.json (устаревший псевдоним для import_catalog)'
 
-        with open('./catalog.json', 'r') as f:
-            the_list = json.loads(f.read())
-
-        categories_to_fill = []
-        products_to_fill = []
-        index_for_products = {}
-        for item in the_list:
-            if item['model'] == 'catalog.category':
-                temp = Category(**item['fields'])
-                categories_to_fill.append(temp)
-                index_for_products |= ({item['pk']: temp})
-            elif item['model'] == 'catalog.product':
-                products_to_fill.append(Product(name=item['fields']['name'],
-                                                description=item['fields']['description'],
-                                                image=item['fields']['image'],
-                                                price=item['fields']['price'],
-                                                data_created=item['fields']['data_created'],
-                                                is_active=item['fields']['is_active'],
-                                                category=index_for_products[item['fields']['category']]))
-        Category.objects.bulk_create(categories_to_fill)
-        Product.objects.bulk_create(products_to_fill)
\ No newline at end of file
+    def handle(self, *args, **options):
+        call_command('import_catalog', './catalog.json', stdout=self.stdout, stderr=self.stderr)
@@ -0,0 +1,101 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from pytils.translit import slugify
+
+from catalog.models import Category, Product, Version
+from materials.models import Material
+from users.models import User
+
+WORDS = (
+    'чай кофе сок вода молоко хлеб сыр масло мёд джем печенье торт шоколад орехи '
+    'зелёный чёрный свежий домашний фермерский сладкий крепкий лёгкий новый классический'
+).split()
+
+# Пароль всех сгенерированных пользователей (для сценария входа в нагрузочном тесте)
+DEFAULT_PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Заполняет БД синтетическими категориями, товарами, версиями, материалами и пользователями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--versions', type=int, default=3, help='Версий на товар, одна из них текущая')
+        parser.add_argument('--materials', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help='Одинаковый seed даёт одинаковые данные')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            categories = Category.objects.bulk_create(
+                [Category(name=self.phrase(2).capitalize(), description=self.phrase(12))
+                 for _ in range(options['categories'])],
+                batch_size=self.batch_size,
+            )
+            products = Product.objects.bulk_create(
+                [Product(name=self.phrase(3).capitalize(), description=self.phrase(40),
+                         category=self.random.choice(categories), price=self.random.randint(10, 10000),
+                         is_published=self.random.random() < 0.8)
+                 for _ in range(options['products'])],
+                batch_size=self.batch_size,
+            )
+            self.create_versions(products, options['versions'])
+            self.create_materials(options['materials'])
+            self.create_users(options['users'])
+
+        self.stdout.write(
+            f'Создано: категорий {len(categories)}, товаров {len(products)}, '
+            f'материалов {options["materials"]}, пользователей {options["users"]} '
+            f'(пароль "{DEFAULT_PASSWORD}")'
+        )
+
+    def phrase(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words))
+
+    def create_versions(self, products, per_product):
+        if not per_product or not products:
+            return
+        versions = [
+            Version(product=product, version_number=number, version_name=f'{product.name} v{number}',
+                    is_current=number == per_product)
+            for product in products for number in range(1, per_product + 1)
+        ]
+        Version.objects.bulk_create(versions, batch_size=self.batch_size)
+        # bulk_create не вызывает сигналы: ссылку на текущую версию проставляем одним UPDATE
+        pks = [product.pk for product in products]
+        Product.objects.filter(pk__gte=min(pks), pk__lte=max(pks)).update(
+            current_version=Subquery(
+                Version.objects.filter(product=OuterRef('pk'), is_current=True).values('pk')[:1]
+            )
+        )
+
+    def create_materials(self, count):
+        materials = []
+        for number in range(count):
+            title = self.phrase(4).capitalize()
+            materials.append(Material(
+                title=title,
+                body='\n\n'.join(self.phrase(60) for _ in range(5)),
+                slug=f'{slugify(title)}-{number}',
+                views_count=self.random.randint(0, 10000),
+                is_published=self.random.random() < 0.9,
+            ))
+        Material.objects.bulk_create(materials, batch_size=self.batch_size)
+
+    def create_users(self, count):
+        # Хэш считается один раз: иначе генерация упрётся в PBKDF2
+        password = make_password(DEFAULT_PASSWORD)
+        start = User.objects.count()
+        User.objects.bulk_create(
+            [User(email=f'bench{start + number}@example.com', password=password) for number in range(count)],
+            batch_size=self.batch_size,
+        )
@@ -0,0 +1,222 @@
+import json
+import os
+
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from catalog.models import Category, Product, Version, VersionCategory
+from catalog.services import invalidate_product_cards, products_bulk_updated, sync_current_versions, \
+    with_card_key_fields
+from catalog.streaming import COMPRESSION_SUFFIXES, iter_json_objects, open_text_reader
+
+# Модели фикстуры в порядке загрузки: владелец раньше зависимых записей
+IMPORT_MODELS = {
+    'catalog.category': Category,
+    'catalog.product': Product,
+    'catalog.version': Version,
+    'catalog.versioncategory': VersionCategory,
+}
+# Модель -> (поле-ссылка на владельца, модель владельца)
+PARENTS = {
+    Product: ('category', Category),
+    Version: ('product', Product),
+    VersionCategory: ('category', Category),
+}
+# Производные поля не загружаются: current_version ссылается на версии из
+# следующих файлов и восстанавливается sync_current_versions после их загрузки,
+# search_vector заполняет триггер
+DERIVED_FIELDS = frozenset({'current_version', 'search_vector'})
+FIXTURE_EXTENSIONS = tuple(
+    f'.{fmt}{suffix}' for fmt in ('json', 'ndjson') for suffix in COMPRESSION_SUFFIXES.values()
+)
+
+
+class Command(BaseCommand):
+    help = ('Загружает каталог из фикстуры (JSON-массив или NDJSON, в том числе .gz/.zst) или каталога '
+            'файлов export_catalog пачками с upsert по pk')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='./catalog.json',
+                            help='файл фикстуры или каталог с файлами export_catalog')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--atomic', action='store_true',
+                            help='загрузить всё в одной транзакции')
+        parser.add_argument('--checkpoint',
+                            help='файл прогресса: каждая пачка коммитится отдельно, '
+                                 'повторный запуск продолжит загрузку с места остановки')
+
+    def handle(self, *args, **options):
+        if options['atomic'] and options['checkpoint']:
+            raise CommandError('--atomic и --checkpoint нельзя использовать одновременно')
+        self.batch_size = options['batch_size']
+        self.checkpoint = options['checkpoint']
+        self.known = {Category: set(), Product: set()}
+        self.pending = {model: [] for model in IMPORT_MODELS.values()}
+        # Поля, встретившиеся в текущей пачке: только их и обновляем при конфликте,
+        # чтобы не затирать значениями по умолчанию то, чего нет в файле
+        self.seen_fields = {model: set() for model in IMPORT_MODELS.values()}
+        self.loaded = {'categories': 0, 'products': 0, 'versions': 0, 'skipped': 0}
+        paths = self.find_files(options['path'])
+
+        if options['atomic']:
+            with transaction.atomic():
+                self.load(paths, start=(0, 0))
+        else:
+            self.load(paths, start=self.read_checkpoint(paths))
+            if self.checkpoint and os.path.exists(self.checkpoint):
+                os.remove(self.checkpoint)
+
+        self.stdout.write(
+            'Категорий: {categories}, товаров: {products}, версий: {versions}, '
+            'пропущено: {skipped}'.format(**self.loaded)
+        )
+
+    @staticmethod
+    def find_files(path):
+        if not os.path.isdir(path):
+            return [os.path.abspath(path)]
+        # Имена файлов export_catalog начинаются с номера модели: сортировка сохраняет порядок загрузки
+        return [os.path.abspath(os.path.join(path, name)) for name in sorted(os.listdir(path))
+                if name.endswith(FIXTURE_EXTENSIONS)]
+
+    def load(self, paths, start):
+        first_file, offset = start
+        for index in range(first_file, len(paths)):
+            self.path = paths[index]
+            self.load_file(self.path, offset if index == first_file else 0)
+        self.reset_sequences()
+
+    def load_file(self, path, offset):
+        position = 0
+        with open_text_reader(path) as f:
+            for position, item in enumerate(iter_json_objects(f), start=1):
+                if position <= offset:
+                    continue
+                model = IMPORT_MODELS.get(item['model'])
+                if model is None:
+                    self.loaded['skipped'] += 1
+                    continue
+                self.pending[model].append(self.build(model, item))
+                if sum(map(len, self.pending.values())) >= self.batch_size:
+                    self.flush(position)
+        # Пачка не переходит через границу файла: так прогресс однозначно
+        # задаётся именем файла и номером записи в нём
+        self.flush(position)
+
+    def build(self, model, item):
+        """Создаёт объект модели из записи фикстуры, отбрасывая неизвестные поля"""
+        fields = {}
+        for field in model._meta.concrete_fields:
+            if field.name in item['fields'] and not field.primary_key and field.name not in DERIVED_FIELDS:
+                fields[field.attname] = item['fields'][field.name]
+                self.seen_fields[model].add(field.name)
+        return model(pk=item['pk'], **fields)
+
+    def update_fields(self, model):
+        # date_created заполняется при первой вставке и при повторной загрузке не меняется,
+        # date_modified (auto_now) обновляется всегда, чтобы сбросить кэши страниц
+        fields = self.seen_fields[model] - {'date_created'}
+        if any(field.name == 'date_modified' for field in model._meta.concrete_fields):
+            fields.add('date_modified')
+        self.seen_fields[model] = set()
+        return sorted(fields)
+
+    def flush(self, position):
+        if not any(self.pending.values()):
+            return
+        with transaction.atomic():
+            self.upsert_categories()
+            self.upsert_products()
+            self.upsert_versions(Version, Product)
+            self.upsert_versions(VersionCategory, Category)
+        self.write_checkpoint(position)
+
+    def take(self, model):
+        """Забирает пачку записей модели, отбрасывая записи с несуществующим владельцем"""
+        objs, self.pending[model] = self.pending[model], []
+        update_fields = self.update_fields(model)
+        if model in PARENTS and objs:
+            fk_name, parent = PARENTS[model]
+            attname = model._meta.get_field(fk_name).attname
+            # Владельцы, не встречавшиеся в файле раньше, ищем в БД одним запросом
+            missing = {getattr(obj, attname) for obj in objs} - self.known[parent]
+            if missing:
+                self.known[parent].update(parent.objects.filter(pk__in=missing).values_list('pk', flat=True))
+            kept = [obj for obj in objs if getattr(obj, attname) in self.known[parent]]
+            self.loaded['skipped'] += len(objs) - len(kept)
+            objs = kept
+        return objs, update_fields
+
+    @staticmethod
+    def upsert(model, objs, update_fields):
+        model.objects.bulk_create(objs, update_conflicts=True, unique_fields=['id'], update_fields=update_fields)
+
+    def upsert_categories(self):
+        categories, update_fields = self.take(Category)
+        if not categories:
+            return
+        # date_modified обновляется всегда, поэтому карточки товаров категории
+        # получают новые ключи (см. product_card_cache_keys)
+        self.upsert(Category, categories, update_fields)
+        self.known[Category].update(category.pk for category in categories)
+        self.loaded['categories'] += len(categories)
+
+    def upsert_products(self):
+        products, update_fields = self.take(Product)
+        if not products:
+            return
+        pks = [product.pk for product in products]
+        # Карточки товаров до обновления: ключ кэша содержит прежний date_modified
+        existing = list(with_card_key_fields(Product.objects.filter(pk__in=pks)))
+        self.upsert(Product, products, update_fields)
+        if existing:
+            products_bulk_updated.send(sender=Product, products=existing)
+        self.known[Product].update(pks)
+        self.loaded['products'] += len(products)
+
+    def upsert_versions(self, model, owner_model):
+        versions, update_fields = self.take(model)
+        if not versions:
+            return
+        fk_attname = model._meta.get_field(PARENTS[model][0]).attname
+        owners = {getattr(version, fk_attname) for version in versions}
+        current = [version for version in versions if version.is_current]
+        # Как в save_version_formset: сначала снимаем признак текущей версии
+        # с прочих версий владельца, иначе сработает частичный уникальный индекс
+        if current:
+            model.objects.filter(
+                **{f'{fk_attname}__in': {getattr(version, fk_attname) for version in current}, 'is_current': True}
+            ).exclude(pk__in=[version.pk for version in current]).update(is_current=False)
+        self.upsert(model, versions, update_fields)
+        sync_current_versions(owner_model, owners)
+        if owner_model is Product:
+            invalidate_product_cards(with_card_key_fields(Product.objects.filter(pk__in=owners)))
+        self.loaded['versions'] += len(versions)
+
+    def reset_sequences(self):
+        # pk берутся из файла, поэтому счётчики автоинкремента нужно подтянуть
+        statements = connection.ops.sequence_reset_sql(no_style(), list(IMPORT_MODELS.values()))
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def read_checkpoint(self, paths):
+        """Возвращает (номер файла, номер записи в нём), с которых продолжается загрузка"""
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return 0, 0
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        if state['path'] not in paths:
+            raise CommandError(f'Файл прогресса относится к другой фикстуре: {state["path"]}')
+        self.stdout.write(f'Продолжаем загрузку {state["path"]} с записи {state["offset"] + 1}')
+        return paths.index(state['path']), state['offset']
+
+    def write_checkpoint(self, position):
+        if not self.checkpoint:
+            return
+        tmp_path = f'{self.checkpoint}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'path': self.path, 'offset': position}, f)
+        os.replace(tmp_path, self.checkpoint)
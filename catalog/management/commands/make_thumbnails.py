@@ -0,0 +1,31 @@
+from django.apps import apps
+from django.core.management import BaseCommand
+
+from catalog.storage import MEDIA_FIELDS
+from catalog.thumbnails import generate_renditions, has_renditions
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие уменьшенные копии для уже загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='пересоздать существующие копии')
+
+    def handle(self, *args, **options):
+        names = set()
+        for model_label, field_name in MEDIA_FIELDS:
+            model = apps.get_model(model_label)
+            names.update(model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                         .values_list(field_name, flat=True).distinct())
+
+        created = 0
+        for name in sorted(names):
+            if not options['force'] and has_renditions(name):
+                continue
+            try:
+                generate_renditions(name)
+            except (OSError, ValueError) as exc:
+                self.stderr.write(f'{name}: {exc}')
+                continue
+            created += 1
+        self.stdout.write(f'Обработано изображений: {created}')
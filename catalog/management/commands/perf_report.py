@@ -0,0 +1,70 @@
+import os
+import re
+from collections import defaultdict
+from urllib.request import Request, urlopen
+
+from django.core.management import BaseCommand, CommandError
+
+SAMPLE_RE = re.compile(r'^django_view_(?P<metric>\w+?)(?P<suffix>_sum|_count)?\{(?P<labels>[^}]*)\} (?P<value>\S+)$')
+LABEL_RE = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_metrics(text):
+    """Разбирает вывод /metrics в {представление: {метрика: {квантиль|'sum'|'count': значение}}}"""
+    views = defaultdict(lambda: defaultdict(dict))
+    for line in text.splitlines():
+        match = SAMPLE_RE.match(line)
+        if not match:
+            continue
+        labels = dict(LABEL_RE.findall(match['labels']))
+        key = match['suffix'][1:] if match['suffix'] else labels.get('quantile')
+        views[labels['view']][match['metric']][key] = float(match['value'])
+    return views
+
+
+class Command(BaseCommand):
+    help = 'Выводит сводку по представлениям из метрик работающего сервера (/metrics)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/metrics')
+        parser.add_argument('--token', default=os.environ.get('DJANGO_METRICS_TOKEN', ''),
+                            help='токен METRICS_TOKEN сервера, по умолчанию из DJANGO_METRICS_TOKEN')
+        parser.add_argument('--sort', choices=['total', 'p99', 'count', 'sql'], default='total',
+                            help='total — суммарное время, p99 — хвост задержек, sql — запросов на ответ')
+
+    def handle(self, *args, **options):
+        try:
+            request = Request(options['url'], headers={'Authorization': f'Bearer {options["token"]}'})
+            with urlopen(request, timeout=10) as response:
+                views = parse_metrics(response.read().decode())
+        except OSError as error:
+            raise CommandError(f'Не удалось получить метрики: {error}')
+
+        rows = []
+        for view_name, metrics in views.items():
+            duration = metrics['request_duration_ms']
+            queries = metrics.get('sql_queries', {})
+            count = duration.get('count', 0)
+            rows.append({
+                'view': view_name,
+                'count': count,
+                'total': duration.get('sum', 0) / 1000,
+                'p50': duration.get('0.5', 0),
+                'p99': duration.get('0.99', 0),
+                'sql': queries.get('sum', 0) / count if count else 0,
+                'sql_ms': metrics.get('sql_duration_ms', {}).get('0.99', 0),
+                'render_ms': metrics.get('template_render_ms', {}).get('0.99', 0),
+                'kb': metrics.get('response_bytes', {}).get('0.5', 0) / 1024,
+            })
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+
+        self.stdout.write(
+            f'{"представление":<32} {"запросов":>9} {"всего, с":>9} {"p50, мс":>9} {"p99, мс":>9} '
+            f'{"SQL/отв":>8} {"SQL p99":>8} {"шаблон p99":>11} {"KБ p50":>8}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'{row["view"]:<32} {row["count"]:>9.0f} {row["total"]:>9.2f} {row["p50"]:>9.1f} '
+                f'{row["p99"]:>9.1f} {row["sql"]:>8.1f} {row["sql_ms"]:>8.1f} {row["render_ms"]:>11.1f} '
+                f'{row["kb"]:>8.1f}'
+            )
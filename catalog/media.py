@@ -0,0 +1,84 @@
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.views.static import serve
+
+from catalog.storage import HASHED_NAME_RE
+from catalog.thumbnails import rendition_name
+
+
+class MediaURLResolver:
+    """
+    Построение URL медиафайлов с отпечатком содержимого и LRU-кэшем.
+
+    Имена в хранилище по содержимому (img/ab/<sha256>.jpg) уже уникальны для
+    каждой версии файла, остальным добавляется ?v=<время изменения>. Такие URL
+    можно кэшировать в браузере и CDN бессрочно.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, name, size=None, fmt='jpg'):
+        name = str(name or '')
+        key = (name, size, fmt)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        url, final = self.resolve(name, size, fmt)
+        # Ссылку на оригинал вместо ещё не созданной копии не запоминаем,
+        # чтобы подхватить копию, как только её сгенерирует фоновый пул
+        if final:
+            with self._lock:
+                self._cache[key] = url
+                if len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return url
+
+    def resolve(self, name, size, fmt):
+        if not name:
+            return settings.MEDIA_URL, True
+        final = True
+        if size:
+            thumbnail = rendition_name(name, size, fmt)
+            if default_storage.exists(thumbnail):
+                name = thumbnail
+            else:
+                final = False
+        return settings.MEDIA_URL + name + self.fingerprint(name), final
+
+    @staticmethod
+    def fingerprint(name):
+        if HASHED_NAME_RE.search(name):
+            return ''
+        try:
+            modified = os.stat(default_storage.path(name)).st_mtime_ns
+        except OSError:
+            return ''
+        return f'?v={modified:x}'
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+media_url = MediaURLResolver(maxsize=settings.MEDIA_URL_CACHE_SIZE)
+
+
+def is_fingerprinted(request, path):
+    return bool(HASHED_NAME_RE.search(path) or request.GET.get('v'))
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """Отдача медиафайлов в разработке с заголовками долговременного кэширования"""
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if is_fingerprinted(request, path):
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    return response
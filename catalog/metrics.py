@@ -0,0 +1,237 @@
+import hmac
+import math
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from catalog.middleware import QueryBudget
+
+# Метрики запроса: имя в Prometheus -> описание
+METRICS = {
+    'request_duration_ms': 'Время обработки запроса, мс',
+    'sql_queries': 'Количество SQL-запросов',
+    'sql_duration_ms': 'Суммарное время SQL-запросов, мс',
+    'template_render_ms': 'Время рендеринга шаблона, мс',
+    'response_bytes': 'Размер ответа, байт',
+}
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Histogram:
+    """
+    Гистограмма с логарифмически-линейными корзинами, как в HdrHistogram.
+
+    Каждая степень двойки делится на sub_buckets равных корзин, поэтому
+    относительная погрешность квантилей не превышает 1 / sub_buckets при
+    любом масштабе значений, а память зависит только от их разброса.
+    """
+
+    def __init__(self, sub_buckets=32):
+        self.sub_buckets = sub_buckets
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+
+    def bucket(self, value):
+        if value <= 0:
+            return None
+        mantissa, exponent = math.frexp(value)
+        return exponent * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+
+    def bucket_value(self, bucket):
+        """Нижняя граница корзины: небольшие целые (число запросов) передаются точно"""
+        exponent, sub_bucket = divmod(bucket, self.sub_buckets)
+        return math.ldexp(0.5 + sub_bucket / (2 * self.sub_buckets), exponent)
+
+    def record(self, value):
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other):
+        for bucket, count in list(other.counts.items()):
+            self.counts[bucket] += count
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        # корзина None — нулевые значения, они меньше любых остальных
+        for bucket in sorted(self.counts, key=lambda bucket: -math.inf if bucket is None else bucket):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return 0.0 if bucket is None else self.bucket_value(bucket)
+        return 0.0
+
+
+class MetricsRegistry:
+    """
+    Гистограммы метрик по имени представления.
+
+    Каждый поток пишет в собственный набор гистограмм, поэтому запись
+    обходится без блокировок; блокировка берётся только при появлении
+    нового потока и при чтении, когда наборы всех потоков сливаются.
+    Наборы завершившихся потоков (sync_to_async, пулы ASGI-сервера)
+    вливаются в общий набор retired, чтобы список не рос бесконечно.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = self._new_shard()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_shard():
+        return defaultdict(lambda: defaultdict(Histogram))
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = self._new_shard()
+            with self._lock:
+                self._retire_dead_threads()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead_threads(self):
+        """Вызывается под self._lock: поток уже не пишет в свой набор, его можно слить"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = alive
+
+    @staticmethod
+    def _merge(target, shard):
+        for view_name, histograms in list(shard.items()):
+            for metric, histogram in list(histograms.items()):
+                target[view_name][metric].merge(histogram)
+
+    def record(self, view_name, **values):
+        shard = self._shard()[view_name]
+        for metric, value in values.items():
+            if value is not None:
+                shard[metric].record(value)
+
+    def snapshot(self):
+        """Слитые гистограммы всех потоков: {представление: {метрика: Histogram}}"""
+        merged = self._new_shard()
+        with self._lock:
+            self._retire_dead_threads()
+            self._merge(merged, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            self._merge(merged, shard)
+        return merged
+
+    def clear(self):
+        with self._lock:
+            self._shards = []
+            self._retired = self._new_shard()
+        self._local = threading.local()
+
+    def render_prometheus(self):
+        """Метрики в текстовом формате Prometheus (тип summary)"""
+        snapshot = self.snapshot()
+        lines = []
+        for metric, description in METRICS.items():
+            name = f'django_view_{metric}'
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} summary')
+            for view_name in sorted(snapshot):
+                histogram = snapshot[view_name].get(metric)
+                if histogram is None:
+                    continue
+                for q in QUANTILES:
+                    lines.append(f'{name}{{view="{view_name}",quantile="{q}"}} {histogram.quantile(q):.3f}')
+                lines.append(f'{name}_sum{{view="{view_name}"}} {histogram.total:.3f}')
+                lines.append(f'{name}_count{{view="{view_name}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Записывает для каждого запроса время обработки, число и время SQL-запросов,
+    время рендеринга шаблона (для TemplateResponse) и размер ответа
+    в гистограммы по имени URL (catalog:list_product, users:profile, ...)
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Синхронный хук Django вызывал бы через sync_to_async
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with QueryBudget() as sql:
+            response = self.get_response(request)
+        self.record(request, response, started, sql)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        with QueryBudget() as sql:
+            response = await self.get_response(request)
+        self.record(request, response, started, sql)
+        return response
+
+    @staticmethod
+    def record(request, response, started, sql):
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        if view_name == 'metrics':
+            return
+        registry.record(
+            view_name,
+            request_duration_ms=(time.perf_counter() - started) * 1000,
+            sql_queries=len(sql.executed),
+            sql_duration_ms=sql.elapsed_ms,
+            template_render_ms=getattr(request, 'template_render_ms', None),
+            response_bytes=None if response.streaming else len(response.content),
+        )
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+
+        def finished(rendered):
+            request.template_render_ms = (time.perf_counter() - started) * 1000
+
+        response.add_post_render_callback(finished)
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        return MetricsMiddleware.process_template_response(self, request, response)
+
+
+def metrics_view(request):
+    """Метрики для Prometheus; доступны только с токеном METRICS_TOKEN"""
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
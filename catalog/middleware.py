@@ -0,0 +1,128 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Бюджеты, открытые в текущем контексте. ContextVar, а не сам execute_wrapper
+# соединения: соединения у каждого потока свои, а в async-представлениях ORM
+# работает в потоке sync_to_async, куда asgiref копирует контекст запроса
+_active_budgets = ContextVar('query_budgets', default=())
+
+
+def _record_query(execute, sql, params, many, context):
+    budgets = _active_budgets.get()
+    if not budgets:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        for budget in budgets:
+            budget.executed.append((sql, duration))
+
+
+def install_query_recorder(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос выполнил больше SQL-запросов или потратил на них больше времени, чем разрешено"""
+
+
+class QueryBudget:
+    """
+    Считает SQL-запросы и их суммарное время во всех базах.
+
+    Используется как контекстный менеджер в QueryBudgetMiddleware и в тестах:
+
+        with QueryBudget(queries=2):
+            self.client.get(url)
+    """
+
+    def __init__(self, queries=None, time_ms=None, label=''):
+        self.queries = queries
+        self.time_ms = time_ms
+        self.label = label
+        self.executed = []
+        self._token = None
+
+    @property
+    def elapsed_ms(self):
+        return sum(duration for _, duration in self.executed)
+
+    def __enter__(self):
+        # Соединения, открытые до загрузки модуля, сигнал connection_created пропустили
+        for alias in connections:
+            install_query_recorder(connections[alias])
+        self._token = _active_budgets.set(_active_budgets.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_budgets.reset(self._token)
+        if exc_type is None:
+            self.check()
+
+    def check(self):
+        problems = []
+        if self.queries is not None and len(self.executed) > self.queries:
+            problems.append(f'{len(self.executed)} запросов при бюджете {self.queries}')
+        if self.time_ms is not None and self.elapsed_ms > self.time_ms:
+            problems.append(f'{self.elapsed_ms:.0f} мс SQL при бюджете {self.time_ms} мс')
+        if problems:
+            queries = '\n'.join(sql for sql, _ in self.executed)
+            raise QueryBudgetExceeded(f'{self.label}: {", ".join(problems)}\n{queries}')
+
+
+class QueryBudgetMiddleware:
+    """
+    Проверяет бюджет запросов к БД для каждого HTTP-запроса (в DEBUG и в тестах).
+
+    Бюджет по умолчанию задаётся настройкой QUERY_BUDGET, представление
+    может переопределить его атрибутом query_budget = {'queries': N, 'time_ms': M}.
+    Работает и в синхронной, и в асинхронной цепочке middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+        with QueryBudget() as budget:
+            response = self.get_response(request)
+        self.check(request, budget)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return await self.get_response(request)
+        with QueryBudget() as budget:
+            response = await self.get_response(request)
+        self.check(request, budget)
+        return response
+
+    @staticmethod
+    def check(request, budget):
+        limits = dict(settings.QUERY_BUDGET)
+        match = request.resolver_match
+        if match is not None:
+            view = getattr(match.func, 'view_class', match.func)
+            limits.update(getattr(view, 'query_budget', {}))
+        budget.label = request.path
+        budget.queries = limits.get('queries')
+        budget.time_ms = limits.get('time_ms')
+        budget.check()
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0002_alter_product_options_product_is_published"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-date_created", "-id"], name="catalog_product_keyset_idx"
+            ),
+        ),
+    ]
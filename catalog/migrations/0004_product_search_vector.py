@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:11
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Вектор собирается триггером, поэтому он актуален и при bulk_create/update()
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_search_vector_update_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON catalog_product
+    FOR EACH ROW EXECUTE PROCEDURE catalog_product_search_vector_update();
+
+UPDATE catalog_product SET name = name;
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_search_vector_update_trigger ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_search_vector_update();
+"""
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0003_product_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="catalog_product_search_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
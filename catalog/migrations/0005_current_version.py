@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+# модель-владелец -> (модель версий, поле-ссылка на владельца)
+VERSION_MODELS = {
+    "Product": ("Version", "product"),
+    "Category": ("VersionCategory", "category"),
+}
+
+
+def fill_current_versions(apps, schema_editor):
+    """
+    Оставляет у каждого владельца одну текущую версию (с наибольшим id)
+    и проставляет на неё ссылку current_version
+    """
+    for owner_name, (version_name, fk_name) in VERSION_MODELS.items():
+        owner_model = apps.get_model("catalog", owner_name)
+        version_model = apps.get_model("catalog", version_name)
+        current = version_model.objects.filter(is_current=True)
+        keep = current.values(fk_name).annotate(last_id=Max("id")).values("last_id")
+        current.exclude(id__in=keep).update(is_current=False)
+        owner_model.objects.update(
+            current_version=Subquery(
+                version_model.objects.filter(
+                    **{fk_name: OuterRef("pk"), "is_current": True}
+                ).values("pk")[:1]
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="current_version",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="catalog.versioncategory",
+                verbose_name="Текущая версия",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="current_version",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="catalog.version",
+                verbose_name="Текущая версия",
+            ),
+        ),
+        migrations.RunPython(fill_current_versions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="version",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_current", True)),
+                fields=("product",),
+                name="catalog_version_one_current",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="versioncategory",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_current", True)),
+                fields=("category",),
+                name="catalog_versioncategory_one_current",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce, Now
+
+
+def fill_date_modified(apps, schema_editor):
+    Product = apps.get_model("catalog", "Product")
+    Product.objects.filter(date_modified__isnull=True).update(
+        date_modified=Coalesce(F("date_created"), Now())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0005_current_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="date_modified",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата последнего изменения",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_date_modified, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="product",
+            name="date_modified",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата последнего изменения"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0006_date_modified"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "-id"], name="catalog_product_category_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0007_admin_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="catalog.category",
+                verbose_name="Категория",
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.views.decorators.http import condition
+
+
+class ConditionalDetailMixin:
+    """
+    Условные GET и кэш готовых ответов для страниц деталей.
+
+    ETag и Last-Modified вычисляются по полям даты изменения одним
+    лёгким запросом (values_list), без загрузки объекта и рендеринга
+    шаблона: при совпадении валидатора клиент получает 304. Ответы
+    анонимным пользователям хранятся в кэше под ключом, в который входит
+    валидатор, поэтому сохранение объекта само делает старую запись
+    недостижимой.
+    """
+    # Поля (в том числе через связи), по максимуму которых определяется дата изменения страницы
+    modified_fields = ('date_modified',)
+
+    def get_validators(self):
+        """Возвращает (pk, дата изменения) объекта страницы или None, если его нет"""
+        if not hasattr(self, '_validators'):
+            queryset = self.get_queryset()
+            pk = self.kwargs.get(self.pk_url_kwarg)
+            slug = self.kwargs.get(self.slug_url_kwarg)
+            if pk is not None:
+                queryset = queryset.filter(pk=pk)
+            if slug is not None:
+                queryset = queryset.filter(**{self.get_slug_field(): slug})
+            row = queryset.values_list('pk', *self.modified_fields).first()
+            if row is None:
+                self._validators = None
+            else:
+                dates = [value for value in row[1:] if value is not None]
+                self._validators = row[0], max(dates) if dates else None
+        return self._validators
+
+    def get_last_modified(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        # Для авторизованных страница зависит от пользователя, её различает только ETag
+        if validators is None or request.user.is_authenticated:
+            return None
+        return validators[1]
+
+    def get_etag(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None or validators[1] is None:
+            return None
+        pk, last_modified = validators
+        value = f'{self.model._meta.label}:{pk}:{last_modified.isoformat()}:{request.user.pk}'
+        return hashlib.md5(value.encode()).hexdigest()
+
+    def get_response_cache_key(self, etag):
+        return f'detail_response:{self.model._meta.label_lower}:{etag}'
+
+    def get(self, request, *args, **kwargs):
+        view = condition(etag_func=self.get_etag, last_modified_func=self.get_last_modified)(self.get_cached)
+        return view(request, *args, **kwargs)
+
+    def get_cached(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is None or request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        cache = caches[settings.DETAIL_RESPONSE_CACHE]
+        key = self.get_response_cache_key(etag)
+        response = cache.get(key)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            response.render()
+            cache.set(key, response, settings.DETAIL_RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -1,6 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.shortcuts import get_object_or_404, redirect
+from django.http import Http404
+from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils import timezone
 
 NULLABLE = {'null': True, 'blank': True}
 
@@ -10,6 +14,10 @@ class Category(models.Model):
     description = models.TextField(verbose_name='Описание', **NULLABLE)
     image = models.ImageField(verbose_name='Изображение', upload_to='img/', **NULLABLE)
     created_at = models.DateTimeField(verbose_name='Поле_для_дальнейшего_удаления', **NULLABLE)
+    date_modified = models.DateTimeField(auto_now=True, verbose_name='Дата последнего изменения')
+    # Денормализованная ссылка на версию с is_current=True, поддерживается services.sync_current_version
+    current_version = models.ForeignKey('VersionCategory', on_delete=models.SET_NULL, related_name='+',
+                                        editable=False, verbose_name='Текущая версия', **NULLABLE)
 
     def __str__(self):
         return self.name
@@ -23,12 +31,18 @@ class Product(models.Model):
     name = models.CharField(max_length=100, verbose_name='Наименование')
     description = models.TextField(verbose_name='Описание', **NULLABLE)
     image = models.ImageField(verbose_name='Изображение', upload_to='img/', **NULLABLE)
-    category = models.ForeignKey(Category, verbose_name='Категория', on_delete=models.CASCADE)
+    # Отдельный индекс не нужен: catalog_product_category_idx начинается с category
+    category = models.ForeignKey(Category, verbose_name='Категория', on_delete=models.CASCADE, db_index=False)
     price = models.PositiveIntegerField(verbose_name='Цена', default=0)
     date_created = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
-    date_modified = models.DateTimeField(verbose_name='Дата последнего изменения', **NULLABLE)
+    date_modified = models.DateTimeField(auto_now=True, verbose_name='Дата последнего изменения')
     is_active = models.BooleanField(default=True, verbose_name='в наличие')
     is_published = models.BooleanField(default=False, verbose_name='Опубликовано')
+    # Заполняется триггером PostgreSQL из name и description
+    search_vector = SearchVectorField(editable=False, **NULLABLE)
+    # Денормализованная ссылка на версию с is_current=True, поддерживается services.sync_current_version
+    current_version = models.ForeignKey('Version', on_delete=models.SET_NULL, related_name='+',
+                                        editable=False, verbose_name='Текущая версия', **NULLABLE)
 
     def __str__(self):
         return self.name
@@ -36,6 +50,13 @@ class Product(models.Model):
     class Meta:
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
+        indexes = [
+            # Индекс под курсорную пагинацию главной страницы
+            models.Index(fields=['-date_created', '-id'], name='catalog_product_keyset_idx'),
+            GinIndex(fields=['search_vector'], name='catalog_product_search_idx'),
+            # Фильтр по категории в админке с сортировкой по убыванию id
+            models.Index(fields=['category', '-id'], name='catalog_product_category_idx'),
+        ]
         permissions = [
             ("catalog_app.set_publication", 'Can set publication'),
             ("catalog_app.set_category", 'Can set category'),
@@ -51,11 +72,15 @@ class Version(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='продукт')
 
     def __str__(self):
-        return self.product
+        return self.version_name
 
     class Meta:
         verbose_name = 'Версия'
         verbose_name_plural = 'Версии'
+        constraints = [
+            models.UniqueConstraint(fields=['product'], condition=models.Q(is_current=True),
+                                    name='catalog_version_one_current'),
+        ]
 
 
 class VersionCategory(models.Model):
@@ -66,11 +91,15 @@ class VersionCategory(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name='категория')
 
     def __str__(self):
-        return self.category
+        return self.version_name
 
     class Meta:
         verbose_name = 'Версия'
         verbose_name_plural = 'Версии'
+        constraints = [
+            models.UniqueConstraint(fields=['category'], condition=models.Q(is_current=True),
+                                    name='catalog_versioncategory_one_current'),
+        ]
 
 
 class Contacts(models.Model):
@@ -87,12 +116,13 @@ class Contacts(models.Model):
 
 
 def toggle_activity(request, pk):
-    product_item = get_object_or_404(Product, pk=pk)
-    if product_item.is_active:
-        product_item.is_active = False
-    else:
-        product_item.is_active = True
-
-    product_item.save()
-
-    return redirect(reverse('home'))
+    # Один UPDATE без чтения и полного save(); date_modified меняется явно
+    # (update() не вызывает auto_now), чтобы карточка товара не осталась в кэше
+    updated = Product.objects.filter(pk=pk).update(
+        is_active=models.Case(models.When(is_active=True, then=models.Value(False)), default=models.Value(True)),
+        date_modified=timezone.now(),
+    )
+    if not updated:
+        raise Http404
+
+    return redirect(reverse('catalog:list_product'))
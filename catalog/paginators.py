@@ -0,0 +1,193 @@
+import json
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class KeysetPage:
+    """Страница выборки, полученная по курсору (keyset pagination)"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по курсору на паре полей (дата, id).
+
+    В отличие от стандартного Paginator не выполняет COUNT(*) и OFFSET:
+    каждая страница выбирается условием "строго после последней записи
+    предыдущей страницы", поэтому стоимость запроса не зависит от глубины.
+    Назад страница выбирается так же, "строго до первой записи следующей"
+    (курсор before), в обратном порядке с последующим разворотом.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-date_created', '-id')):
+        self.per_page = per_page
+        self.ordering = ordering
+        self.queryset = queryset.order_by(*ordering)
+
+    def encode_cursor(self, obj):
+        date_field, pk_field = (name.lstrip('-') for name in self.ordering)
+        value = f'{getattr(obj, date_field).isoformat()}|{getattr(obj, pk_field)}'
+        return urlsafe_base64_encode(value.encode())
+
+    def decode_cursor(self, cursor):
+        try:
+            date_value, pk_value = urlsafe_base64_decode(cursor).decode().split('|')
+            date_value, pk_value = parse_datetime(date_value), int(pk_value)
+        except (ValueError, UnicodeDecodeError):
+            raise Http404('Некорректный курсор страницы')
+        if date_value is None:
+            raise Http404('Некорректный курсор страницы')
+        return date_value, pk_value
+
+    def get_page_queryset(self, cursor=None, before=None):
+        queryset = self.queryset
+        forward = not before
+        if cursor or before:
+            date_value, pk_value = self.decode_cursor(before or cursor)
+            date_field, pk_field = (name.lstrip('-') for name in self.ordering)
+            lookup = 'lt' if self.ordering[0].startswith('-') == forward else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__{lookup}': date_value})
+                | Q(**{date_field: date_value, f'{pk_field}__{lookup}': pk_value})
+            )
+        if not forward:
+            queryset = queryset.reverse()
+        # Берём на одну запись больше, чтобы узнать о наличии следующей страницы
+        return queryset[:self.per_page + 1]
+
+    def make_page(self, object_list, cursor=None, before=None):
+        more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if before:
+            # Записи выбраны в обратном порядке; после них страница before точно есть
+            object_list.reverse()
+            next_cursor = self.encode_cursor(object_list[-1]) if object_list else before
+            previous_cursor = self.encode_cursor(object_list[0]) if more else None
+        else:
+            next_cursor = self.encode_cursor(object_list[-1]) if more else None
+            previous_cursor = self.encode_cursor(object_list[0]) if cursor and object_list else None
+        return KeysetPage(object_list, next_cursor, previous_cursor)
+
+    def page(self, cursor=None, before=None):
+        return self.make_page(list(self.get_page_queryset(cursor, before)), cursor, before)
+
+    async def apage(self, cursor=None, before=None):
+        """Асинхронный вариант page() для async-представлений"""
+        objects = [obj async for obj in self.get_page_queryset(cursor, before)]
+        return self.make_page(objects, cursor, before)
+
+
+async def apaginate(queryset, per_page, number):
+    """
+    Асинхронный аналог Paginator.get_page: COUNT и выборка страницы
+    выполняются через async ORM, шаблону отдаётся обычная Page
+    """
+    paginator = Paginator(queryset, per_page)
+    # count — cached_property, подставляем значение, посчитанное асинхронно
+    paginator.count = await queryset.acount()
+    page = paginator.get_page(number)
+    page.object_list = [obj async for obj in page.object_list]
+    return paginator, page
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для больших таблиц в админке: число строк берётся из оценки
+    планировщика PostgreSQL вместо COUNT(*), который читает всю таблицу.
+
+    Без фильтров — pg_class.reltuples (обновляется ANALYZE и autovacuum),
+    с фильтрами — ожидаемое число строк из EXPLAIN. Небольшие выборки
+    и другие СУБД считаются точно.
+
+    Оценка используется только для отображения числа строк и ссылок на
+    страницы: номер страницы за оценкой не отвергается, а конец выборки
+    определяется по самой странице, после чего число строк становится точным.
+    """
+    # Ниже этой оценки COUNT(*) дешёв, а неточность заметна
+    estimate_threshold = 10_000
+    estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < self.estimate_threshold:
+            return super().count
+        self.estimated = True
+        return estimate
+
+    def set_count(self, count, exact=True):
+        self.count = count
+        self.estimated = not exact
+        self.__dict__.pop('num_pages', None)
+
+    def validate_number(self, number):
+        if not self.count or not self.estimated:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        # Строка сверх страницы показывает, есть ли следующая
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            # Страница за концом выборки: считаем точно, чтобы get_page()
+            # вернул настоящую последнюю страницу
+            self.set_count(self.object_list.count())
+            raise EmptyPage(self.error_messages['no_results'])
+        if len(object_list) <= self.per_page:
+            self.set_count(bottom + len(object_list))
+        elif self.count <= bottom + self.per_page:
+            # Оценка занижена: следующая страница точно есть
+            self.set_count(bottom + len(object_list), exact=False)
+        return self._get_page(object_list[:self.per_page], number, self)
+
+    def estimate_count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or connections[self.object_list.db].vendor != 'postgresql':
+            return None
+        with connections[self.object_list.db].cursor() as cursor:
+            if not query.where:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                               [query.model._meta.db_table])
+                row = cursor.fetchone()
+                # -1: таблицу ещё не анализировали
+                return int(row[0]) if row and row[0] >= 0 else None
+            sql, params = query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,204 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connections, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from catalog.models import Category, Contacts, Product, Version, VersionCategory
+
+PRODUCT_CARD_FRAGMENT = 'product_card'
+
+# Права из Product.Meta.permissions (codename содержит точку)
+SET_PUBLICATION_PERM = 'catalog.catalog_app.set_publication'
+SET_CATEGORY_PERM = 'catalog.catalog_app.set_category'
+
+# Массовые действия с товарами: имя -> (право, значения для UPDATE);
+# категорию для set_category передаёт вызывающий код
+PRODUCT_BULK_ACTIONS = {
+    'publish': (SET_PUBLICATION_PERM, {'is_published': True}),
+    'unpublish': (SET_PUBLICATION_PERM, {'is_published': False}),
+    'toggle_active': ('catalog.change_product',
+                      {'is_active': Case(When(is_active=True, then=Value(False)), default=Value(True))}),
+    'set_category': (SET_CATEGORY_PERM, {}),
+}
+
+# Отправляется один раз на пачку bulk_update_products вместо post_save на каждый товар;
+# products — товары с date_modified до обновления
+products_bulk_updated = Signal()
+# Названия и описания на русском: используем соответствующую конфигурацию стемминга
+SEARCH_CONFIG = 'russian'
+
+
+def product_card_cache_keys(product):
+    """
+    Ключи фрагмента карточки товара для обоих вариантов прав на удаление.
+
+    В ключ входит date_modified категории: после её изменения карточки всех
+    её товаров получают новые ключи без перебора товаров.
+    """
+    return [
+        make_template_fragment_key(PRODUCT_CARD_FRAGMENT,
+                                   [product.pk, product.date_modified, product.category.date_modified, can_delete])
+        for can_delete in (True, False)
+    ]
+
+
+def with_card_key_fields(queryset):
+    """Товары только с полями, из которых строится ключ карточки"""
+    return queryset.select_related('category').only('pk', 'date_modified', 'category__date_modified')
+
+
+def invalidate_product_cards(products):
+    """Сбрасывает закэшированные карточки переданных товаров"""
+    keys = []
+    for product in products:
+        keys.extend(product_card_cache_keys(product))
+    if keys:
+        cache.delete_many(keys)
+
+
+def bulk_update_products(queryset, chunk_size=None, **values):
+    """
+    queryset.update(**values) пачками по первичному ключу.
+
+    Каждая пачка — отдельный короткий UPDATE в своей транзакции, так что
+    тысячи товаров не блокируются разом. date_modified обновляется явно
+    (update() не вызывает auto_now), после пачки отправляется один сигнал
+    products_bulk_updated. Возвращает число обновлённых товаров.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_BULK_CHUNK_SIZE
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    updated = 0
+    last_pk = None
+    while True:
+        chunk = list((pks if last_pk is None else pks.filter(pk__gt=last_pk))[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1]
+        with transaction.atomic():
+            products = list(with_card_key_fields(Product.objects.filter(pk__in=chunk)))
+            updated += Product.objects.filter(pk__in=chunk).update(date_modified=timezone.now(), **values)
+        products_bulk_updated.send(sender=Product, products=products, fields=set(values))
+        if len(chunk) < chunk_size:
+            break
+    return updated
+
+
+def search_products(query, queryset=None):
+    """
+    Полнотекстовый поиск товаров, отсортированный по релевантности.
+
+    В PostgreSQL использует search_vector и GIN-индекс, на остальных СУБД
+    (SQLite в тестах) откатывается к поиску по вхождению подстроки.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+        ).order_by('-rank', '-id')
+    return queryset.filter(Q(name__icontains=query) | Q(description__icontains=query)).order_by('-id')
+
+
+# модель-владелец -> (модель версий, поле-ссылка на владельца)
+VERSION_MODELS = {
+    Product: (Version, 'product'),
+    Category: (VersionCategory, 'category'),
+}
+
+
+def sync_current_version(owner_model, owner_id):
+    """Проставляет владельцу ссылку current_version на его текущую версию одним UPDATE"""
+    version_model, fk_name = VERSION_MODELS[owner_model]
+    current = version_model.objects.filter(**{fk_name: owner_id, 'is_current': True}).values('pk')[:1]
+    owner_model.objects.filter(pk=owner_id).update(current_version=Subquery(current))
+
+
+def sync_current_versions(owner_model, owner_ids):
+    """sync_current_version для многих владельцев одним UPDATE"""
+    version_model, fk_name = VERSION_MODELS[owner_model]
+    current = version_model.objects.filter(**{fk_name: OuterRef('pk'), 'is_current': True}).values('pk')[:1]
+    owner_model.objects.filter(pk__in=owner_ids).update(current_version=Subquery(current))
+
+
+def save_version_formset(formset):
+    """
+    Атомарно сохраняет формсет версий и обновляет ссылку на текущую версию.
+
+    Признак текущей версии сначала снимается с прочих версий владельца,
+    иначе частичный уникальный индекс сработал бы на промежуточном
+    состоянии, когда текущими отмечены и старая, и новая версия.
+    """
+    owner = formset.instance
+    current = [
+        form.instance for form in formset.forms
+        if form.cleaned_data.get('is_current') and not formset._should_delete_form(form)
+    ]
+    with transaction.atomic():
+        previous = formset.model.objects.filter(**{formset.fk.name: owner, 'is_current': True})
+        if current and current[0].pk:
+            previous = previous.exclude(pk=current[0].pk)
+        previous.update(is_current=False)
+        formset.save()
+        sync_current_version(type(owner), owner.pk)
+    # Владелец обычно сохраняется ещё раз (UpdateView.form_valid), поэтому
+    # подтягиваем новое значение, чтобы не затереть его устаревшим
+    owner.refresh_from_db(fields=['current_version'])
+
+
+def save_contact(name, phone, message):
+    """
+    Записывает обращение из формы контактов одним
+    INSERT ... ON CONFLICT (phone) DO UPDATE: повтор с того же телефона
+    обновляет запись, а не падает с IntegrityError
+    """
+    Contacts.objects.bulk_create(
+        [Contacts(name=name, phone=phone, message=message)],
+        update_conflicts=True,
+        unique_fields=['phone'],
+        update_fields=['name', 'message'],
+    )
+
+
+def client_ip(request):
+    """
+    Адрес клиента. За обратным прокси REMOTE_ADDR — адрес прокси, поэтому
+    для запросов от TRUSTED_PROXIES берётся ближайший к серверу адрес
+    из X-Forwarded-For, не принадлежащий доверенному прокси
+    """
+    remote_addr = request.META.get('REMOTE_ADDR')
+    if remote_addr not in settings.TRUSTED_PROXIES:
+        return remote_addr
+    forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+    for address in reversed(forwarded):
+        if address and address not in settings.TRUSTED_PROXIES:
+            return address
+    return remote_addr
+
+
+def contact_rate_limited(*identities):
+    """
+    Учитывает обращение для каждого идентификатора (телефон, IP) и
+    возвращает True, если хотя бы по одному превышен лимит за окно.
+    Счётчики лежат в общем для всех воркеров кэше (см. SHARED_CACHES)
+    """
+    rate_cache = caches[settings.CONTACTS_RATE_CACHE]
+    limited = False
+    for identity in identities:
+        if not identity:
+            continue
+        key = f'contacts_rate:{identity}'
+        if rate_cache.add(key, 1, timeout=settings.CONTACTS_RATE_WINDOW):
+            count = 1
+        else:
+            try:
+                count = rate_cache.incr(key)
+            except ValueError:
+                rate_cache.set(key, 1, timeout=settings.CONTACTS_RATE_WINDOW)
+                count = 1
+        limited = limited or count > settings.CONTACTS_RATE_LIMIT
+    return limited
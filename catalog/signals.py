@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from catalog.models import Category, Product, Version, VersionCategory
+from catalog.services import invalidate_product_cards, products_bulk_updated, sync_current_version, \
+    with_card_key_fields
+from catalog.thumbnails import renditions_created, schedule_renditions
+
+
+def deleted_by_cascade(sender, origin=None, **kwargs):
+    """
+    Запись удаляется каскадом от другой модели (origin — объект или queryset,
+    с которого началось удаление): её владелец удаляется тем же каскадом,
+    и синхронизировать его по каждой строке незачем
+    """
+    return origin is not None and getattr(origin, 'model', type(origin)) is not sender
+
+
+@receiver([post_save, post_delete], sender=Product)
+def reset_product_card(sender, instance, **kwargs):
+    if not deleted_by_cascade(sender, **kwargs):
+        invalidate_product_cards([instance])
+
+
+@receiver(products_bulk_updated, sender=Product)
+def reset_product_cards_on_bulk_update(sender, products, **kwargs):
+    invalidate_product_cards(products)
+
+
+@receiver([post_save, post_delete], sender=Version)
+def reset_product_card_on_version(sender, instance, **kwargs):
+    if deleted_by_cascade(sender, **kwargs):
+        return
+    sync_current_version(Product, instance.product_id)
+    product = with_card_key_fields(Product.objects.filter(pk=instance.product_id)).first()
+    if product is not None:
+        invalidate_product_cards([product])
+
+
+@receiver([post_save, post_delete], sender=VersionCategory)
+def sync_category_current_version(sender, instance, **kwargs):
+    if not deleted_by_cascade(sender, **kwargs):
+        sync_current_version(Category, instance.category_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def make_image_renditions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'image' in update_fields:
+        schedule_renditions(instance.image)
+
+
+@receiver(renditions_created, sender=Product)
+def reset_product_card_on_renditions(sender, pk, **kwargs):
+    # Карточка, закэшированная до появления копий, ссылается на оригинал
+    invalidate_product_cards(with_card_key_fields(Product.objects.filter(pk=pk)))
@@ -0,0 +1,191 @@
+import gzip
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.apps import StaticFilesConfig as BaseStaticFilesConfig
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Что сжимать при collectstatic; картинки и шрифты уже сжаты
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml')
+
+# Расширение сжатой копии -> Content-Encoding, в порядке предпочтения
+ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+
+
+class StaticFilesConfig(BaseStaticFilesConfig):
+    """
+    django.contrib.staticfiles без неиспользуемых файлов Bootstrap.
+
+    Шаблоны подключают только bootstrap.min.css и bootstrap.min.js: полные
+    версии, grid, reboot и bundle в STATIC_ROOT не копируются. Карты
+    подключаемых .min-файлов остаются для отладки в браузере.
+    """
+    ignore_patterns = [
+        *BaseStaticFilesConfig.ignore_patterns,
+        'bootstrap.css', 'bootstrap.css.map', 'bootstrap.js', 'bootstrap.js.map',
+        'bootstrap-grid*', 'bootstrap-reboot*', 'bootstrap.bundle*',
+    ]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, который после расстановки отпечатков
+    (css/bootstrap.min.css -> css/bootstrap.min.<md5>.css) пишет рядом
+    с каждым текстовым файлом .gz и, если установлен brotli, .br.
+
+    Файлы сжимаются параллельно: zlib и brotli отпускают GIL, поэтому
+    потоки загружают все ядра. Копия сохраняется, только если она заметно
+    меньше оригинала.
+
+    Пока collectstatic не запускался (тесты, свежая копия репозитория),
+    манифеста нет, и ссылки ведут на файлы без отпечатка.
+    """
+    # sourceMappingURL не переписывается: для popper.min.js нет карты,
+    # а .min-файлы и без этого ссылаются на карты по исходному имени
+    patterns = tuple(
+        (extension, tuple(pattern for pattern in extension_patterns if 'sourceMappingURL' not in str(pattern)))
+        for extension, extension_patterns in ManifestStaticFilesStorage.patterns
+    )
+    min_compression_ratio = 0.95
+    manifest_strict = False
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = [name for name in self.hashed_files.values() if name.endswith(COMPRESSIBLE_EXTENSIONS)]
+        with ThreadPoolExecutor(os.cpu_count()) as pool:
+            list(pool.map(self.compress, names))
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for extension, compressed in variants.items():
+            if len(compressed) < len(data) * self.min_compression_ratio:
+                with open(path + extension, 'wb') as target:
+                    target.write(compressed)
+
+
+class StaticFilesMiddleware:
+    """
+    Отдаёт собранную collectstatic статику из STATIC_ROOT без отдельного
+    веб-сервера, как WhiteNoise.
+
+    Список файлов строится один раз при запуске, поэтому запрос к статике
+    не доходит до маршрутизации, сессий и БД. Файлы с отпечатком отдаются
+    с Cache-Control immutable, сжатая копия выбирается по Accept-Encoding.
+    Остальные файлы кэшируются ненадолго, поэтому у всех есть ETag и
+    Last-Modified, и повторная проверка получает 304 без тела.
+    В режиме DEBUG не используется: статику отдаёт runserver из исходников.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.files = self.scan(settings.STATIC_ROOT, urlparse(settings.STATIC_URL).path)
+
+    @staticmethod
+    def scan(root, prefix):
+        hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename.endswith(tuple(ENCODINGS)) and os.path.exists(path[:-3]):
+                    continue
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                stat = os.stat(path)
+                files[prefix + name] = {
+                    'path': path,
+                    'mtime': int(stat.st_mtime),
+                    'etag': f'{int(stat.st_mtime):x}-{stat.st_size:x}',
+                    'immutable': name in hashed_names,
+                    'variants': {
+                        encoding: path + extension
+                        for extension, encoding in ENCODINGS.items() if os.path.exists(path + extension)
+                    },
+                }
+        return files
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.find(request)
+        if static_file is None:
+            return self.get_response(request)
+        return self.serve(request, static_file)
+
+    async def __acall__(self, request):
+        static_file = self.find(request)
+        if static_file is None:
+            return await self.get_response(request)
+        return self.serve(request, static_file)
+
+    def find(self, request):
+        return self.files.get(request.path) if request.method in ('GET', 'HEAD') else None
+
+    def serve(self, request, static_file):
+        accepted = {
+            token.split(';')[0].strip() for token in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+            if not token.replace(' ', '').endswith(';q=0')
+        }
+        encoding = next((encoding for encoding in static_file['variants'] if encoding in accepted), None)
+        path = static_file['variants'][encoding] if encoding else static_file['path']
+        # Сжатая копия — другое представление файла, у неё свой ETag
+        etag = quote_etag(f'{static_file["etag"]}-{encoding}' if encoding else static_file['etag'])
+
+        if self.not_modified(request, etag, static_file['mtime']):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(static_file['path'])
+            response = FileResponse(open(path, 'rb'), content_type=content_type or 'application/octet-stream',
+                                    filename=os.path.basename(static_file['path']))
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['X-Content-Type-Options'] = 'nosniff'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(static_file['mtime'])
+        if static_file['variants']:
+            response['Vary'] = 'Accept-Encoding'
+        if static_file['immutable']:
+            response['Cache-Control'] = f'public, max-age={settings.STATIC_CACHE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = 'public, max-age=60'
+        return response
+
+    @staticmethod
+    def not_modified(request, etag, mtime):
+        # If-None-Match важнее If-Modified-Since (RFC 9110, 13.1.3)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags or f'W/{etag}' in etags
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        return if_modified_since is not None and not was_modified_since(if_modified_since, mtime)
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+
+from catalog.thumbnails import delete_renditions
+
+# Поля с загружаемыми файлами: (модель, поле)
+MEDIA_FIELDS = (
+    ('catalog.Product', 'image'),
+    ('catalog.Category', 'image'),
+    ('materials.Material', 'image'),
+    ('users.User', 'avatar'),
+)
+
+# Имя, уже приведённое к виду img/ab/<sha256>.jpg
+HASHED_NAME_RE = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла — sha256 его содержимого.
+
+    img/meats.jpg сохраняется как img/3f/3f2a...c9.jpg. Повторная загрузка
+    того же файла не создаёт копию с суффиксом, а возвращает уже сохранённое имя.
+    Файлы без ссылок удаляет команда collect_media (см. collect_orphans).
+    """
+    hashed_directories = ('img', 'blog', 'avatars')
+
+    def is_hashed_upload(self, name):
+        return name.replace('\\', '/').split('/')[0] in self.hashed_directories
+
+    @staticmethod
+    def hashed_name(directory, hexdigest, extension):
+        return f'{directory}/{hexdigest[:2]}/{hexdigest}{extension.lower()}'
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя зависит только от содержимого и выбирается в _save
+        if self.is_hashed_upload(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not self.is_hashed_upload(name):
+            return super()._save(name, content)
+
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1]
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        # Хэшируем по кускам одновременно с записью во временный файл
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.path(directory), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = self.hashed_name(directory, hexdigest, extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+                # Свежее mtime защищает файл от collect_media, пока запись
+                # со ссылкой на него ещё не зафиксирована
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+
+def referenced_media_names():
+    """Имена файлов, на которые ссылается хотя бы одна запись"""
+    names = set()
+    for model_label, field_name in MEDIA_FIELDS:
+        names.update(
+            apps.get_model(model_label)._default_manager.exclude(**{field_name: ''})
+            .values_list(field_name, flat=True).distinct().iterator()
+        )
+    return names
+
+
+def collect_orphans(storage, grace_period, dry_run=False):
+    """
+    Удаляет из хранилища по содержимому файлы без ссылок и их уменьшенные
+    копии, а также недописанные .part. Возвращает список удалённых имён.
+
+    Файлы моложе grace_period секунд не трогаются: загрузка пишет файл
+    раньше, чем фиксируется транзакция со ссылкой на него. Ссылки читаются
+    до обхода файлов, а возраст файла проверяется непосредственно перед удалением.
+    """
+    referenced = referenced_media_names()
+    removed = []
+    for directory in storage.hashed_directories:
+        for dirpath, _, filenames in os.walk(storage.path(directory)):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(dirpath, filename), storage.location).replace(os.sep, '/')
+                if not (HASHED_NAME_RE.search(name) or name.endswith('.part')) or name in referenced:
+                    continue
+                try:
+                    if time.time() - os.path.getmtime(storage.path(name)) < grace_period:
+                        continue
+                except FileNotFoundError:
+                    continue
+                removed.append(name)
+                if not dry_run:
+                    storage.delete(name)
+                    delete_renditions(name)
+    return removed
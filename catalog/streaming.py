@@ -0,0 +1,73 @@
+import gzip
+import io
+import json
+import re
+
+# Символы, которые могут стоять между объектами в JSON-массиве или NDJSON
+_SEPARATORS_RE = re.compile(r'[ \t\r\n,\[\]]*')
+
+
+def iter_json_objects(stream, chunk_size=64 * 1024):
+    """
+    Последовательно отдаёт объекты верхнего уровня из JSON-массива или NDJSON.
+
+    Файл читается кусками по chunk_size символов, в памяти держится только
+    текущий кусок, поэтому размер фикстуры не ограничен объёмом памяти.
+    Внутри куска разбор идёт по смещению, без копирования остатка буфера
+    после каждого объекта: буфер обрезается один раз при дочитывании.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        position = _SEPARATORS_RE.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                return
+            buffer, position = stream.read(chunk_size), 0
+            eof = not buffer
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # объект оборван на границе куска: дочитываем
+            if eof:
+                raise
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield obj
+        position = end
+
+
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def open_text_reader(path):
+    """Открывает на чтение текстовый файл, сжатый gzip (.gz), zstd (.zst) или несжатый"""
+    if path.endswith(COMPRESSION_SUFFIXES['gzip']):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith(COMPRESSION_SUFFIXES['zstd']):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('Для чтения zstd установите пакет zstandard')
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def open_text_writer(path, compress='none'):
+    """Открывает файл на запись текста с необязательным сжатием gzip/zstd"""
+    if compress == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    if compress == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('Для сжатия zstd установите пакет zstandard')
+        raw = open(path, 'wb')
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw, closefd=True), encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
@@ -1,13 +1,15 @@
 from django import template
 from django.utils.safestring import mark_safe
-from config.settings import MEDIA_URL
+
+from catalog.media import media_url
 
 register = template.Library()
 
 
 @register.simple_tag
-def media_tag(product):
-    return MEDIA_URL + str(product)
+def media_tag(product, size=None, fmt='jpg'):
+    """Ссылка на изображение; с size — на уменьшенную копию, если она уже создана"""
+    return media_url(product, size, fmt)
 
 
 @register.filter
@@ -15,5 +17,3 @@ def split(text):
     """Обрезает переданный текст до 100 символов"""
     result = text[0:100]
     return mark_safe(result)
-
-
@@ -1,3 +1,1199 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db import IntegrityError, connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from catalog.admin import ProductAdmin
+from catalog.apps import check_shared_caches
+from catalog.forms import VersionFormSet
+from catalog.media import media_url, serve_media
+from catalog.management.commands.export_catalog import export_shard
+from catalog.management.commands.perf_report import parse_metrics
+from catalog.metrics import Histogram, MetricsMiddleware, registry
+from catalog.paginators import EstimatedCountPaginator
+from catalog.middleware import QueryBudget, QueryBudgetExceeded
+from catalog.services import bulk_update_products, client_ip, products_bulk_updated
+from catalog.staticfiles import StaticFilesMiddleware
+from catalog.models import Category, Contacts, Product, Version, VersionCategory
+from catalog.storage import HASHED_NAME_RE
+from catalog.streaming import iter_json_objects
+from catalog.templatetags.media_tag import media_tag
+from catalog.thumbnails import generate_renditions, renditions_created
+from catalog.views import ProductListView
+from catalog.views_async import AsyncProductListView
+from materials.models import Material
+from users.models import User
+
+
+class ProductListViewTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Напитки')
+        for number in range(30):
+            product = Product.objects.create(name=f'Товар {number}', category=cls.category, price=number)
+            Version.objects.create(product=product, version_number=1, version_name='первая', is_current=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        # Абсолютный лимит — ProductListView.query_budget (QueryBudgetMiddleware);
+        # здесь проверяем только, что число запросов не растёт с размером страницы
+        counts = []
+        for page_size in (5, 30):
+            with mock.patch.object(ProductListView, 'paginate_by', page_size):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse('catalog:list_product'))
+            self.assertEqual(len(response.context['object_list']), page_size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_cursor_walks_whole_catalog(self):
+        seen = []
+        url = reverse('catalog:list_product')
+        with mock.patch.object(ProductListView, 'paginate_by', 7):
+            response = self.client.get(url)
+            while True:
+                seen.extend(product.pk for product in response.context['object_list'])
+                page = response.context['page_obj']
+                if not page.has_next():
+                    break
+                response = self.client.get(url, {'cursor': page.next_cursor})
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_previous_cursor_walks_back(self):
+        url = reverse('catalog:list_product')
+        with mock.patch.object(ProductListView, 'paginate_by', 7):
+            pages = [self.client.get(url)]
+            while pages[-1].context['page_obj'].has_next():
+                pages.append(self.client.get(url, {'cursor': pages[-1].context['page_obj'].next_cursor}))
+            self.assertFalse(pages[0].context['page_obj'].has_previous())
+            response = pages[-1]
+            for expected in reversed(pages[:-1]):
+                page = response.context['page_obj']
+                self.assertContains(response, f'?before={page.previous_cursor}')
+                response = self.client.get(url, {'before': page.previous_cursor})
+                self.assertEqual([product.pk for product in response.context['object_list']],
+                                 [product.pk for product in expected.context['object_list']])
+                self.assertTrue(response.context['page_obj'].has_next())
+            self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('catalog:list_product'), {'cursor': 'мусор'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductCardCacheTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Салаты')
+        self.product = Product.objects.create(name='Цезарь', category=category)
+        self.version = Version.objects.create(product=self.product, version_number=1, version_name='первая',
+                                              is_current=True)
+
+    def test_card_is_served_from_cache(self):
+        url = reverse('catalog:list_product')
+        self.client.get(url)
+        # Изменение в обход save() сигналы не видят: карточка берётся из кэша
+        Product.objects.filter(pk=self.product.pk).update(name='Оливье')
+        self.assertContains(self.client.get(url), 'Цезарь')
+
+    def test_card_is_invalidated_on_product_save(self):
+        url = reverse('catalog:list_product')
+        self.client.get(url)
+        self.product.name = 'Оливье'
+        self.product.save()
+        self.assertContains(self.client.get(url), 'Оливье')
+
+    def test_card_is_invalidated_on_version_save(self):
+        url = reverse('catalog:list_product')
+        self.client.get(url)
+        self.version.version_name = 'вторая'
+        self.version.save()
+        self.assertContains(self.client.get(url), 'вторая')
+
+    def test_card_follows_category_rename(self):
+        url = reverse('catalog:list_product')
+        self.client.get(url)
+        category = self.product.category
+        category.name = 'Закуски'
+        # Товары категории не перебираются: ключ карточки содержит date_modified категории
+        with self.assertNumQueries(1):
+            category.save()
+        self.assertContains(self.client.get(url), 'Закуски')
+
+
+class CascadeDeleteTestCase(TestCase):
+
+    def delete_queries(self, products):
+        category = Category.objects.create(name='Напитки')
+        VersionCategory.objects.create(category=category, version_number=1, version_name='осень', is_current=True)
+        for number in range(products):
+            product = Product.objects.create(name=f'Сок {number}', category=category)
+            Version.objects.create(product=product, version_number=1, version_name='первая')
+            Version.objects.create(product=product, version_number=2, version_name='вторая', is_current=True)
+        with CaptureQueriesContext(connection) as queries:
+            category.delete()
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_versions(self):
+        # обработчики версий не синхронизируют владельцев, удаляемых тем же каскадом
+        self.assertEqual(self.delete_queries(2), self.delete_queries(20))
+        self.assertFalse(Version.objects.exists())
+
+    def test_deleting_version_resets_current_version(self):
+        product = Product.objects.create(name='Сок', category=Category.objects.create(name='Напитки'))
+        version = Version.objects.create(product=product, version_number=1, version_name='первая', is_current=True)
+        product.refresh_from_db()
+        self.assertEqual(product.current_version, version)
+        version.delete()
+        product.refresh_from_db()
+        self.assertIsNone(product.current_version)
+
+
+class ImportCatalogTestCase(TestCase):
+    fixture_items = [
+        {'model': 'catalog.category', 'pk': 10, 'fields': {'name': 'Мясо', 'description': 'Мясо'}},
+        {'model': 'catalog.product', 'pk': 20,
+         'fields': {'name': 'Индейка', 'category': 10, 'price': 100, 'data_created': '2024-01-23'}},
+        {'model': 'catalog.product', 'pk': 21, 'fields': {'name': 'Курица', 'category': 10, 'price': 90}},
+        {'model': 'catalog.product', 'pk': 22, 'fields': {'name': 'Без категории', 'category': 999}},
+        {'model': 'catalog.category', 'pk': 11, 'fields': {'name': 'Напитки'}},
+        {'model': 'catalog.product', 'pk': 23, 'fields': {'name': 'Сок', 'category': 11, 'price': 50}},
+    ]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'catalog.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.fixture_items, f, ensure_ascii=False, indent=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_streaming_parser_handles_array_and_ndjson(self):
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(list(iter_json_objects(f, chunk_size=7)), self.fixture_items)
+        ndjson = '\n'.join(json.dumps(item) for item in self.fixture_items)
+        self.assertEqual(list(iter_json_objects(StringIO(ndjson), chunk_size=5)), self.fixture_items)
+
+    def test_import_is_idempotent_upsert(self):
+        call_command('import_catalog', self.path, batch_size=2, stdout=StringIO())
+        Product.objects.filter(pk=20).update(name='Старое название')
+        call_command('import_catalog', self.path, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(sorted(Product.objects.values_list('pk', flat=True)), [20, 21, 23])
+        self.assertEqual(Product.objects.get(pk=20).name, 'Индейка')
+        self.assertEqual(Product.objects.get(pk=23).category_id, 11)
+
+    def test_resume_from_checkpoint(self):
+        checkpoint = os.path.join(self.tmp_dir.name, 'import.checkpoint')
+        with open(checkpoint, 'w') as f:
+            json.dump({'path': os.path.abspath(self.path), 'offset': 4}, f)
+        call_command('import_catalog', self.path, checkpoint=checkpoint, stdout=StringIO())
+
+        self.assertEqual(list(Category.objects.values_list('pk', flat=True)), [11])
+        self.assertEqual(list(Product.objects.values_list('pk', flat=True)), [23])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_import_refreshes_cached_cards(self):
+        cache.clear()
+        call_command('import_catalog', self.path, stdout=StringIO())
+        Product.objects.update(is_published=True)
+        url = reverse('catalog:list_product')
+        self.assertContains(self.client.get(url), 'Индейка')
+
+        self.fixture_items[1]['fields']['name'] = 'Индейка копчёная'
+        self.fixture_items[0]['fields']['name'] = 'Мясо и птица'
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.fixture_items, f, ensure_ascii=False)
+        call_command('import_catalog', self.path, stdout=StringIO())
+        response = self.client.get(url)
+        self.assertContains(response, 'Индейка копчёная')
+        self.assertContains(response, 'Мясо и птица')
+
+    def test_export_import_round_trip(self):
+        Product.objects.all().delete()
+        category = Category.objects.create(name='Напитки')
+        VersionCategory.objects.create(category=category, version_number=1, version_name='осень', is_current=True)
+        for number in range(3):
+            product = Product.objects.create(name=f'Сок {number}', category=category)
+            Version.objects.create(product=product, version_number=1, version_name='первая')
+            Version.objects.create(product=product, version_number=2, version_name='вторая', is_current=True)
+        expected = {
+            model: sorted(model.objects.values_list('pk', flat=True))
+            for model in (Category, Product, Version, VersionCategory)
+        }
+        export_dir = os.path.join(self.tmp_dir.name, 'export')
+        call_command('export_catalog', export_dir, workers=1, shard_size=2, compress='gzip', stdout=StringIO())
+        Category.objects.all().delete()
+
+        out = StringIO()
+        call_command('import_catalog', export_dir, batch_size=4, stdout=out)
+        self.assertIn('версий: 7, пропущено: 0', out.getvalue())
+        for model, pks in expected.items():
+            self.assertEqual(sorted(model.objects.values_list('pk', flat=True)), pks)
+        for product in Product.objects.select_related('current_version'):
+            self.assertEqual(product.current_version.version_name, 'вторая')
+        self.assertEqual(Category.objects.get().current_version.version_name, 'осень')
+
+        # повторная загрузка с другой текущей версией не нарушает уникальность
+        Version.objects.filter(version_number=2).update(is_current=False)
+        Version.objects.filter(version_number=1).update(is_current=True)
+        call_command('import_catalog', export_dir, stdout=StringIO())
+        self.assertEqual(set(Version.objects.filter(is_current=True).values_list('version_number', flat=True)), {2})
+
+
+class ImportCatalogBatchesTestCase(TransactionTestCase):
+    """Без общей транзакции теста: каждая пачка импорта коммитится и проверяет внешние ключи"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_export_import_round_trip_into_empty_database(self):
+        category = Category.objects.create(name='Напитки')
+        VersionCategory.objects.create(category=category, version_number=1, version_name='осень', is_current=True)
+        for number in range(3):
+            product = Product.objects.create(name=f'Сок {number}', category=category)
+            Version.objects.create(product=product, version_number=1, version_name='первая', is_current=True)
+        export_dir = os.path.join(self.tmp_dir.name, 'export')
+        call_command('export_catalog', export_dir, workers=1, shard_size=2, stdout=StringIO())
+        Category.objects.all().delete()
+
+        call_command('import_catalog', export_dir, batch_size=2, stdout=StringIO())
+        self.assertEqual(Product.objects.filter(current_version__version_name='первая').count(), 3)
+        self.assertEqual(Category.objects.get().current_version.version_name, 'осень')
+
+
+class ExportCatalogTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        category = Category.objects.create(name='Напитки')
+        for number in range(5):
+            product = Product.objects.create(name=f'Сок {number}', category=category)
+            Version.objects.create(product=product, version_number=1, version_name='первая')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_export_sharded_gzip_ndjson(self):
+        call_command('export_catalog', self.tmp_dir.name, workers=1, shard_size=2, compress='gzip',
+                     stdout=StringIO())
+        records = []
+        for filename in sorted(os.listdir(self.tmp_dir.name)):
+            self.assertTrue(filename.endswith('.ndjson.gz'))
+            with gzip.open(os.path.join(self.tmp_dir.name, filename), 'rt', encoding='utf-8') as f:
+                records.extend(iter_json_objects(f))
+
+        models = [record['model'] for record in records]
+        self.assertEqual(models.count('catalog.category'), 1)
+        self.assertEqual(models.count('catalog.product'), 5)
+        self.assertEqual(models.count('catalog.version'), 5)
+        # категории выгружаются раньше товаров, чтобы файлы можно было загрузить по порядку
+        self.assertEqual(models[0], 'catalog.category')
+        product = next(record for record in records if record['model'] == 'catalog.product')
+        self.assertEqual(product['fields']['name'], 'Сок 0')
+        self.assertNotIn('current_version', product['fields'])
+        self.assertNotIn('search_vector', product['fields'])
+
+
+class ParallelExportCatalogTestCase(TransactionTestCase):
+    """Несколько воркеров; вместо процессов spawn — потоки с собственными соединениями"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        category = Category.objects.create(name='Напитки')
+        for number in range(5):
+            product = Product.objects.create(name=f'Сок {number}', category=category)
+            Version.objects.create(product=product, version_number=1, version_name='первая')
+
+    def test_export_with_several_workers(self):
+        def executor(max_workers, **kwargs):
+            return ThreadPoolExecutor(max_workers)
+
+        err = StringIO()
+        with mock.patch('catalog.management.commands.export_catalog.ProcessPoolExecutor', executor), \
+                mock.patch('catalog.management.commands.export_catalog.export_shard',
+                           side_effect=lambda *args, **kwargs: self.in_thread(export_shard, *args, **kwargs)):
+            call_command('export_catalog', self.tmp_dir.name, workers=3, shard_size=2, stdout=StringIO(),
+                         stderr=err)
+        # на SQLite общего снимка нет, команда об этом предупреждает
+        self.assertIn('--workers 1', err.getvalue())
+
+        Category.objects.all().delete()
+        call_command('import_catalog', self.tmp_dir.name, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertEqual(Version.objects.count(), 5)
+
+    @staticmethod
+    def in_thread(function, *args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            connection.close()
+
+
+class ProductSearchTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Напитки')
+        Product.objects.create(name='Апельсиновый сок', description='Свежевыжатый', category=category)
+        Product.objects.create(name='Морс', description='Клюквенный сок', category=category)
+        Product.objects.create(name='Квас', category=category)
+        Product.objects.create(name='Сок из архива', category=category, is_active=False)
+
+    def test_search(self):
+        response = self.client.get(reverse('catalog:search'), {'q': 'сок'})
+        names = {product.name for product in response.context['object_list']}
+        self.assertEqual(names, {'Апельсиновый сок', 'Морс'})
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('catalog:search'))
+        self.assertEqual(len(response.context['object_list']), 0)
+
+
+class ThumbnailsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp_dir.name)
+        self.settings_override.enable()
+        os.makedirs(os.path.join(self.tmp_dir.name, 'img'))
+        Image.new('RGB', (800, 400), 'red').save(os.path.join(self.tmp_dir.name, 'img', 'meats.jpg'))
+        media_url.clear()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def test_generate_renditions(self):
+        generate_renditions('img/meats.jpg')
+        for size in (150, 320, 640):
+            for fmt in ('jpg', 'webp'):
+                with Image.open(os.path.join(self.tmp_dir.name, 'img', f'meats.{size}.{fmt}')) as image:
+                    self.assertEqual(image.size, (size, size))
+
+    def test_media_tag_falls_back_to_original(self):
+        self.assertEqual(media_tag('img/meats.jpg', 320).split('?')[0], '/media/img/meats.jpg')
+        generate_renditions('img/meats.jpg')
+        self.assertEqual(media_tag('img/meats.jpg', 320).split('?')[0], '/media/img/meats.320.jpg')
+        self.assertEqual(media_tag('img/meats.jpg', 320, 'webp').split('?')[0], '/media/img/meats.320.webp')
+
+    def test_renditions_are_scheduled_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Category.objects.create(name='Мясо', image='img/meats.jpg')
+        self.assertEqual(len(callbacks), 1)
+
+    def test_card_shows_renditions_when_ready(self):
+        category = Category.objects.create(name='Мясо')
+        with mock.patch('catalog.signals.schedule_renditions'):
+            product = Product.objects.create(name='Индейка', category=category, image='img/meats.jpg')
+        url = reverse('catalog:list_product')
+        self.assertContains(self.client.get(url), '/media/img/meats.jpg')
+        generate_renditions('img/meats.jpg')
+        renditions_created.send(sender=Product, pk=product.pk, name='img/meats.jpg')
+        self.assertContains(self.client.get(url), '/media/img/meats.320.jpg')
+
+
+class ContentAddressedStorageTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp_dir.name)
+        self.settings_override.enable()
+        # уменьшенные копии здесь не нужны
+        patcher = mock.patch('catalog.signals.schedule_renditions')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.category = Category.objects.create(name='Мясо')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def upload(self, filename, content=b'jpeg-bytes'):
+        return Product.objects.create(name=filename, category=self.category,
+                                      image=SimpleUploadedFile(filename, content, content_type='image/jpeg'))
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload('meats.jpg')
+        second = self.upload('meats_copy.JPG')
+        digest = hashlib.sha256(b'jpeg-bytes').hexdigest()
+        self.assertEqual(first.image.name, f'img/{digest[:2]}/{digest}.jpg')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir.name, 'img', digest[:2])), [f'{digest}.jpg'])
+
+    def collect_media(self, grace_period=0):
+        out = StringIO()
+        call_command('collect_media', grace_period=grace_period, stdout=out)
+        return out.getvalue()
+
+    def age(self, path, seconds=2 * 24 * 60 * 60):
+        os.utime(path, (time.time() - seconds, time.time() - seconds))
+
+    def test_orphaned_file_is_collected_by_sweep(self):
+        first = self.upload('meats.jpg')
+        second = self.upload('meats.jpg')
+        path = first.image.path
+        self.age(path)
+
+        first.delete()
+        self.collect_media()
+        self.assertTrue(os.path.exists(path))
+
+        # удаление записи не трогает файлы, их убирает только отложенная сборка
+        second.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertIn('Удалено файлов: 1', self.collect_media())
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_file_is_collected_by_sweep(self):
+        product = self.upload('meats.jpg')
+        old_path = product.image.path
+        product.image = SimpleUploadedFile('salads.jpg', b'other-bytes', content_type='image/jpeg')
+        product.save()
+        self.collect_media()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(product.image.path))
+
+    def test_dedupe_deletes_legacy_file_after_commit(self):
+        legacy_path = os.path.join(self.tmp_dir.name, 'img', 'legacy.jpg')
+        os.makedirs(os.path.dirname(legacy_path))
+        with open(legacy_path, 'wb') as f:
+            f.write(b'legacy-bytes')
+        product = Product.objects.create(name='Старый', category=self.category, image='img/legacy.jpg')
+
+        with mock.patch('catalog.management.commands.dedupe_media.Command.relink', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                call_command('dedupe_media', stdout=StringIO())
+        # откат: старое имя продолжает работать
+        self.assertTrue(os.path.exists(legacy_path))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            call_command('dedupe_media', stdout=StringIO())
+        product.refresh_from_db()
+        self.assertTrue(HASHED_NAME_RE.search(product.image.name))
+        self.assertTrue(os.path.exists(product.image.path))
+        # до фиксации старый файл на месте
+        self.assertTrue(os.path.exists(legacy_path))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(os.path.exists(legacy_path))
+
+    def test_dedupe_changes_page_validators(self):
+        legacy_path = os.path.join(self.tmp_dir.name, 'img', 'legacy.jpg')
+        os.makedirs(os.path.dirname(legacy_path))
+        with open(legacy_path, 'wb') as f:
+            f.write(b'legacy-bytes')
+        self.category.image = 'img/legacy.jpg'
+        self.category.save()
+        product = Product.objects.create(name='Старый', category=self.category, image='img/legacy.jpg')
+        material = Material.objects.create(title='Статья', body='Текст', image='img/legacy.jpg')
+        urls = [reverse('catalog:view_product', args=[product.pk]),
+                reverse('catalog:view_category', args=[self.category.pk]),
+                reverse('materials:view_material', args=[material.pk])]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        call_command('dedupe_media', stdout=StringIO())
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, 'legacy.jpg')
+
+    def test_fresh_files_survive_sweep(self):
+        # файл уже записан, а запись со ссылкой на него ещё не зафиксирована
+        product = self.upload('meats.jpg')
+        path = product.image.path
+        self.age(path)
+        Product.objects.filter(pk=product.pk).update(image='')
+        self.upload('meats.jpg')
+        Product.objects.update(image='')
+        # повторная загрузка обновила mtime существующего файла
+        self.collect_media(grace_period=60 * 60)
+        self.assertTrue(os.path.exists(path))
+        self.collect_media()
+        self.assertFalse(os.path.exists(path))
+
+
+class MediaURLResolverTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp_dir.name)
+        self.settings_override.enable()
+        media_url.clear()
+        self.digest = hashlib.sha256(b'jpeg-bytes').hexdigest()
+        self.hashed_name = f'img/{self.digest[:2]}/{self.digest}.jpg'
+        for name in ('img/legacy.jpg', self.hashed_name):
+            os.makedirs(os.path.join(self.tmp_dir.name, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.tmp_dir.name, name), 'wb') as f:
+                f.write(b'jpeg-bytes')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def test_fingerprints(self):
+        self.assertEqual(media_url(self.hashed_name), f'/media/{self.hashed_name}')
+        self.assertRegex(media_url('img/legacy.jpg'), r'^/media/img/legacy\.jpg\?v=[0-9a-f]+$')
+        self.assertEqual(media_url(''), '/media/')
+
+    def test_resolved_urls_are_memoized(self):
+        media_url('img/legacy.jpg')
+        with mock.patch('catalog.media.os.stat') as stat:
+            media_url('img/legacy.jpg')
+        stat.assert_not_called()
+
+    def test_fingerprinted_media_is_cached_forever(self):
+        request = RequestFactory().get(f'/media/{self.hashed_name}')
+        response = serve_media(request, self.hashed_name, document_root=self.tmp_dir.name)
+        self.assertIn('immutable', response['Cache-Control'])
+
+        request = RequestFactory().get('/media/img/legacy.jpg')
+        response = serve_media(request, 'img/legacy.jpg', document_root=self.tmp_dir.name)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+
+@override_settings(CONTACTS_RATE_LIMIT=3, TRUSTED_PROXIES=['10.0.0.1'])
+class ContactsViewTestCase(TestCase):
+
+    def setUp(self):
+        caches['counters'].clear()
+
+    def post(self, phone, message='Здравствуйте', **extra):
+        return self.client.post(reverse('catalog:contacts'),
+                                {'name': 'Иван', 'phone': phone, 'message': message}, **extra)
+
+    def test_submission_is_written_at_once(self):
+        with self.assertNumQueries(1):
+            response = self.post('+7 900 000-00-01')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '+7900000-00-01')
+        self.post('+7 900 000-00-01', message='Второе сообщение')
+        self.assertEqual(Contacts.objects.get(phone='+7900000-00-01').message, 'Второе сообщение')
+
+    def test_existing_phone_is_updated(self):
+        Contacts.objects.create(name='Иван', phone='+7900000-00-03', message='Старое')
+        self.post('+7900000-00-03', message='Новое')
+        self.assertEqual(Contacts.objects.get().message, 'Новое')
+
+    def test_rate_limit_by_ip(self):
+        for number in range(3):
+            self.assertEqual(self.post(f'+7900000-00-1{number}').status_code, 200)
+        response = self.post('+7900000-00-19')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Contacts.objects.count(), 3)
+
+    def test_rate_limit_behind_proxy(self):
+        # за прокси у всех клиентов один REMOTE_ADDR: лимит считается по X-Forwarded-For
+        for number in range(3):
+            self.post(f'+7900000-00-2{number}', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1')
+        self.assertEqual(self.post('+7900000-00-29', REMOTE_ADDR='10.0.0.1',
+                                   HTTP_X_FORWARDED_FOR='1.1.1.1').status_code, 429)
+        self.assertEqual(self.post('+7900000-00-30', REMOTE_ADDR='10.0.0.1',
+                                   HTTP_X_FORWARDED_FOR='2.2.2.2').status_code, 200)
+
+    def test_forwarded_for_is_ignored_from_untrusted_peers(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='5.5.5.5', HTTP_X_FORWARDED_FOR='1.1.1.1')
+        self.assertEqual(client_ip(request), '5.5.5.5')
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.1.1.1')
+        self.assertEqual(client_ip(request), '1.1.1.1')
+
+    def test_invalid_form(self):
+        response = self.client.post(reverse('catalog:contacts'), {'name': 'Иван'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Contacts.objects.exists())
+
+
+class CurrentVersionTestCase(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Напитки')
+        self.product = Product.objects.create(name='Чай', category=self.category)
+
+    def test_current_version_is_denormalized(self):
+        first = Version.objects.create(product=self.product, version_number=1, version_name='первая', is_current=True)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_version, first)
+
+        first.is_current = False
+        first.save()
+        self.product.refresh_from_db()
+        self.assertIsNone(self.product.current_version)
+
+    def test_only_one_current_version(self):
+        Version.objects.create(product=self.product, version_number=1, version_name='первая', is_current=True)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Version.objects.create(product=self.product, version_number=2, version_name='вторая', is_current=True)
+
+    def formset_data(self, versions, current):
+        data = {
+            'name': self.category.name,
+            'versioncategory_set-TOTAL_FORMS': len(versions) + 1,
+            'versioncategory_set-INITIAL_FORMS': len(versions),
+            'versioncategory_set-MIN_NUM_FORMS': 0,
+            'versioncategory_set-MAX_NUM_FORMS': 1000,
+            # флажок is_active пустой формы отмечен по умолчанию, браузер его отправляет
+            f'versioncategory_set-{len(versions)}-is_active': 'on',
+        }
+        for index, version in enumerate(versions):
+            data.update({
+                f'versioncategory_set-{index}-id': version.pk,
+                f'versioncategory_set-{index}-category': self.category.pk,
+                f'versioncategory_set-{index}-version_number': version.version_number,
+                f'versioncategory_set-{index}-version_name': version.version_name,
+                f'versioncategory_set-{index}-is_active': 'on',
+            })
+            if version in current:
+                data[f'versioncategory_set-{index}-is_current'] = 'on'
+        return data
+
+    def test_formset_switches_current_version(self):
+        first = VersionCategory.objects.create(category=self.category, version_number=1, version_name='первая',
+                                               is_current=True)
+        second = VersionCategory.objects.create(category=self.category, version_number=2, version_name='вторая')
+
+        # вторая версия идёт в формсете раньше первой, с которой признак снимается
+        response = self.client.post(reverse('catalog:edit_category', args=[self.category.pk]),
+                                    self.formset_data([second, first], current=[second]))
+        self.assertEqual(response.status_code, 302)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.current_version, second)
+        self.assertEqual(list(VersionCategory.objects.filter(is_current=True)), [second])
+
+    def test_formset_rejects_two_current_versions(self):
+        first = VersionCategory.objects.create(category=self.category, version_number=1, version_name='первая')
+        second = VersionCategory.objects.create(category=self.category, version_number=2, version_name='вторая')
+        self.client.post(reverse('catalog:edit_category', args=[self.category.pk]),
+                         self.formset_data([first, second], current=[first, second]))
+        self.assertFalse(VersionCategory.objects.filter(is_current=True).exists())
+
+
+class VersionEditPageTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='owner@test.ru')
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Напитки')
+        self.product = Product.objects.create(name='Чай', category=self.category)
+
+    def get_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_versions(self):
+        url = reverse('catalog:edit_product', args=[self.product.pk])
+        Version.objects.create(product=self.product, version_number=1, version_name='первая')
+        # первый запрос кладёт пользователя сессии в кэш
+        self.get_queries(url)
+        baseline = self.get_queries(url)
+        Version.objects.bulk_create(
+            Version(product=self.product, version_number=number, version_name=f'версия {number}')
+            for number in range(2, 30)
+        )
+        self.assertEqual(self.get_queries(url), baseline)
+
+    def test_formset_rejects_foreign_product(self):
+        other = Product.objects.create(name='Кофе', category=self.category)
+        version = Version.objects.create(product=self.product, version_number=1, version_name='первая')
+        self.assertNotIn('<option', str(VersionFormSet(instance=self.product).forms[0]['product']))
+        formset = VersionFormSet({
+            'version_set-TOTAL_FORMS': 1,
+            'version_set-INITIAL_FORMS': 1,
+            'version_set-MIN_NUM_FORMS': 0,
+            'version_set-MAX_NUM_FORMS': 1000,
+            'version_set-0-id': version.pk,
+            'version_set-0-product': other.pk,
+            'version_set-0-version_number': 1,
+            'version_set-0-version_name': 'чужая',
+        }, instance=self.product)
+        self.assertFalse(formset.is_valid())
+        self.assertIn('product', formset.forms[0].errors)
+
+    def test_invalid_formset_is_not_saved(self):
+        data = {
+            'name': 'Новое имя',
+            'versioncategory_set-TOTAL_FORMS': 1,
+            'versioncategory_set-INITIAL_FORMS': 0,
+            'versioncategory_set-MIN_NUM_FORMS': 0,
+            'versioncategory_set-MAX_NUM_FORMS': 1000,
+            'versioncategory_set-0-version_name': 'без номера',
+        }
+        response = self.client.post(reverse('catalog:edit_category', args=[self.category.pk]), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['formset'].errors)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.name, 'Напитки')
+
+
+class ConditionalDetailTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Напитки')
+        self.product = Product.objects.create(name='Чай', category=self.category)
+        self.url = reverse('catalog:view_product', args=[self.product.pk])
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_anonymous_response_is_cached(self):
+        self.client.get(self.url)
+        # из кэша: только запрос дат изменения
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Чай')
+
+    def test_save_invalidates_cached_page(self):
+        etag = self.client.get(self.url)['ETag']
+        self.product.name = 'Кофе'
+        self.product.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Кофе')
+
+        self.category.name = 'Горячие напитки'
+        self.category.save()
+        self.assertContains(self.client.get(self.url), 'Горячие напитки')
+
+    def test_authenticated_users_get_own_etag(self):
+        anonymous_etag = self.client.get(self.url)['ETag']
+        self.client.force_login(User.objects.create(email='user@test.ru'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_missing_object(self):
+        self.assertEqual(self.client.get(reverse('catalog:view_product', args=[0])).status_code, 404)
+
+
+class AsyncViewsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Напитки')
+        for number in range(15):
+            Product.objects.create(name=f'Товар {number}', category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_product_list_matches_sync_view(self):
+        sync_response = await sync_to_async(self.client.get)(reverse('catalog:list_product'))
+        response = await self.async_client.get(reverse('catalog:async_list_product'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product.pk for product in response.context['object_list']],
+            [product.pk for product in sync_response.context['object_list']],
+        )
+
+        next_page = await self.async_client.get(reverse('catalog:async_list_product'),
+                                                {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual(len(next_page.context['object_list']), 3)
+
+    async def test_detail_views(self):
+        product = await Product.objects.afirst()
+        response = await self.async_client.get(reverse('catalog:async_view_product', args=[product.pk]))
+        self.assertContains(response, product.name)
+        response = await self.async_client.get(reverse('catalog:async_view_category', args=[self.category.pk]))
+        self.assertContains(response, 'Напитки')
+
+        response = await self.async_client.get(reverse('catalog:async_view_product', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryBudgetTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Напитки')
+        for number in range(5):
+            Product.objects.create(name=f'Товар {number}', category=category)
+
+    def test_budget_helper(self):
+        with QueryBudget(queries=1) as budget:
+            self.client.get(reverse('catalog:list_product'))
+        self.assertEqual(len(budget.executed), 1)
+
+        with self.assertRaises(QueryBudgetExceeded):
+            with QueryBudget(queries=1):
+                list(Product.objects.all())
+                list(Category.objects.all())
+
+    def test_view_budget_is_enforced(self):
+        with mock.patch.object(ProductListView, 'query_budget', {'queries': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('catalog:list_product'))
+
+    @override_settings(QUERY_BUDGET_ENABLED=False)
+    def test_disabled(self):
+        with mock.patch.object(ProductListView, 'query_budget', {'queries': 0}):
+            self.assertEqual(self.client.get(reverse('catalog:list_product')).status_code, 200)
+
+    async def test_async_view_budget_is_enforced(self):
+        # Запросы async-представления выполняются в потоке sync_to_async
+        with mock.patch.object(AsyncProductListView, 'query_budget', {'queries': 0}, create=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.async_client.get(reverse('catalog:async_list_product'))
+
+    async def test_budget_counts_sync_to_async_queries(self):
+        with QueryBudget() as budget:
+            await sync_to_async(list)(Product.objects.all())
+            await Category.objects.acount()
+        self.assertEqual(len(budget.executed), 2)
+
+
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_histogram_quantiles(self):
+        histogram = Histogram()
+        for value in range(1, 10001):
+            histogram.record(value)
+        self.assertEqual(histogram.count, 10000)
+        self.assertAlmostEqual(histogram.quantile(0.5), 5000, delta=5000 / 32)
+        self.assertAlmostEqual(histogram.quantile(0.99), 9900, delta=9900 / 32)
+
+    def test_requests_are_recorded_per_view(self):
+        Product.objects.create(name='Чай', category=Category.objects.create(name='Напитки'))
+        for _ in range(3):
+            self.client.get(reverse('catalog:list_product'))
+        histograms = registry.snapshot()['catalog:list_product']
+        self.assertEqual(histograms['request_duration_ms'].count, 3)
+        self.assertEqual(histograms['sql_queries'].quantile(0.5), 1)
+        self.assertEqual(histograms['template_render_ms'].count, 3)
+        self.assertGreater(histograms['response_bytes'].quantile(0.5), 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('catalog:list_category'))
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        views = parse_metrics(response.content.decode())
+        self.assertEqual(views['catalog:list_category']['request_duration_ms']['count'], 1)
+        self.assertNotIn('metrics', views)
+
+        # адрес клиента не важен: за прокси REMOTE_ADDR у всех 127.0.0.1
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_endpoint_disabled_without_token(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 404)
+
+    async def test_async_requests_are_recorded(self):
+        await Product.objects.acreate(name='Чай', category=await Category.objects.acreate(name='Напитки'))
+        response = await self.async_client.get(reverse('catalog:async_list_product'))
+        self.assertEqual(response.status_code, 200)
+        histograms = registry.snapshot()['catalog:async_list_product']
+        self.assertEqual(histograms['request_duration_ms'].count, 1)
+        self.assertGreater(histograms['sql_queries'].quantile(0.5), 0)
+
+    def test_middleware_is_async_in_async_chain(self):
+        async def get_response(request):
+            return None
+
+        middleware = MetricsMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertTrue(iscoroutinefunction(middleware.process_template_response))
+        self.assertFalse(iscoroutinefunction(MetricsMiddleware(lambda request: None)))
+
+    def test_dead_thread_shards_are_merged(self):
+        threads = [threading.Thread(target=registry.record, args=('view',), kwargs={'sql_queries': 1})
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        registry.record('view', sql_queries=1)
+        self.assertEqual(len(registry._shards), 1)
+        self.assertEqual(registry.snapshot()['view']['sql_queries'].count, 6)
+
+
+class GenerateDataTestCase(TestCase):
+
+    def test_generates_consistent_data(self):
+        call_command('generate_data', categories=2, products=10, versions=3, materials=5, users=3, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 10)
+        self.assertEqual(Version.objects.count(), 30)
+        self.assertEqual(Material.objects.count(), 5)
+        self.assertEqual(User.objects.filter(email__startswith='bench').count(), 3)
+        # у каждого товара ровно одна текущая версия, и ссылка на неё проставлена
+        self.assertFalse(Product.objects.filter(current_version=None).exists())
+        self.assertTrue(User.objects.first().check_password('bench-password'))
+
+
+class StaticFilesTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(STATIC_ROOT=self.tmp_dir.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def collectstatic(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_urls_without_manifest(self):
+        self.assertEqual(staticfiles_storage.url('css/bootstrap.min.css'), '/static/css/bootstrap.min.css')
+
+    def test_collectstatic_prunes_and_compresses(self):
+        self.collectstatic()
+        hashed_name = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        path = os.path.join(self.tmp_dir.name, hashed_name)
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as compressed:
+            self.assertEqual(compressed.read(), original.read())
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'css', 'bootstrap-grid.css')))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'js', 'bootstrap.bundle.js')))
+
+    def test_middleware_serves_compressed_immutable_files(self):
+        self.collectstatic()
+        middleware = StaticFilesMiddleware(lambda request: None)
+        url = staticfiles_storage.url('css/bootstrap.min.css')
+
+        response = middleware(RequestFactory().get(url, HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+        response = middleware(RequestFactory().get(url))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response.close()
+
+        self.assertIsNone(middleware(RequestFactory().get('/static/css/bootstrap.css')))
+
+    def test_middleware_revalidates_plain_files(self):
+        self.collectstatic()
+        middleware = StaticFilesMiddleware(lambda request: None)
+        # имя без отпечатка: кэшируется ненадолго и проверяется повторно
+        url = '/static/css/bootstrap.min.css'
+        response = middleware(RequestFactory().get(url))
+        response.close()
+        self.assertNotIn('immutable', response['Cache-Control'])
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = middleware(RequestFactory().get(url, HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(middleware(RequestFactory().get(url, HTTP_IF_MODIFIED_SINCE=last_modified)).status_code,
+                         304)
+
+        # ETag сжатой копии не подходит к несжатому ответу
+        url = staticfiles_storage.url('css/bootstrap.min.css')
+        response = middleware(RequestFactory().get(url, HTTP_ACCEPT_ENCODING='gzip'))
+        response.close()
+        response = middleware(RequestFactory().get(url, HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    async def test_middleware_in_async_chain(self):
+        await sync_to_async(self.collectstatic)()
+
+        async def get_response(request):
+            return 'view'
+
+        middleware = StaticFilesMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get(staticfiles_storage.url('css/bootstrap.min.css')))
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+        self.assertEqual(await middleware(RequestFactory().get('/catalog/')), 'view')
+
+
+class BulkProductActionsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Напитки')
+        self.other_category = Category.objects.create(name='Еда')
+        self.products = [
+            Product.objects.create(name=f'Товар {number}', category=self.category, is_active=number % 2 == 0)
+            for number in range(5)
+        ]
+        self.moderator = User.objects.create(email='moder@test.ru')
+        self.moderator.user_permissions.add(Permission.objects.get(codename='catalog_app.set_publication'))
+
+    def test_update_in_chunks_with_one_signal_per_chunk(self):
+        batches = []
+
+        def receiver(sender, products, **kwargs):
+            batches.append(len(products))
+
+        products_bulk_updated.connect(receiver)
+        self.addCleanup(products_bulk_updated.disconnect, receiver)
+        updated = bulk_update_products(Product.objects.all(), chunk_size=2, is_published=True)
+
+        self.assertEqual(updated, 5)
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertFalse(Product.objects.filter(is_published=False).exists())
+
+    def test_moderator_republishes_category_in_one_request(self):
+        Product.objects.create(name='Чужой', category=self.other_category)
+        self.client.force_login(self.moderator)
+        response = self.client.post(reverse('catalog:bulk_product'),
+                                    {'action': 'publish', 'category': self.category.pk})
+        self.assertEqual(response.json(), {'updated': 5})
+        self.assertEqual(Product.objects.filter(is_published=True).count(), 5)
+
+    def test_bulk_endpoint_checks_permissions(self):
+        self.client.force_login(self.moderator)
+        url = reverse('catalog:bulk_product')
+        response = self.client.post(url, {'action': 'set_category', 'ids': '1,2',
+                                          'target_category': self.other_category.pk})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post(url, {'action': 'publish'}).status_code, 400)
+
+    def test_admin_actions(self):
+        admin_user = User.objects.create(email='admin@test.ru', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        url = reverse('admin:catalog_product_changelist')
+        selected = [product.pk for product in self.products[:2]]
+
+        self.client.post(url, {'action': 'toggle_active', '_selected_action': selected})
+        self.assertEqual(list(Product.objects.filter(pk__in=selected).order_by('pk')
+                              .values_list('is_active', flat=True)), [False, True])
+
+        response = self.client.post(url, {'action': 'set_category', '_selected_action': selected})
+        self.assertContains(response, 'Выбрано товаров: 2')
+        self.client.post(url, {'action': 'set_category', '_selected_action': selected, 'apply': '1',
+                               'category': self.other_category.pk})
+        self.assertEqual(Product.objects.filter(category=self.other_category).count(), 2)
+
+
+class AdminChangelistTestCase(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create(email='admin@test.ru', is_staff=True, is_superuser=True))
+        self.category = Category.objects.create(name='Напитки')
+
+    def get_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        product = Product.objects.create(name='Чай', category=self.category)
+        Version.objects.create(product=product, version_number=1, version_name='первая')
+        for name in ('catalog_product', 'catalog_version'):
+            url = reverse(f'admin:{name}_changelist')
+            self.get_queries(url)
+            baseline = self.get_queries(url)
+            for number in range(10):
+                category = Category.objects.create(name=f'Категория {number}')
+                Version.objects.create(product=Product.objects.create(name=f'Товар {number}', category=category),
+                                       version_number=1, version_name='первая')
+            self.assertEqual(self.get_queries(url), baseline)
+
+    def test_estimated_count_skips_count_query(self):
+        paginator = EstimatedCountPaginator(Product.objects.all(), 100)
+        with mock.patch.object(EstimatedCountPaginator, 'estimate_count', return_value=2_000_000):
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, 2_000_000)
+
+    def test_pages_past_estimate_are_reachable(self):
+        for number in range(5):
+            Product.objects.create(name=f'Товар {number}', category=self.category)
+        queryset = Product.objects.order_by('pk')
+        with mock.patch.object(EstimatedCountPaginator, 'estimate_count', return_value=2), \
+                mock.patch.object(EstimatedCountPaginator, 'estimate_threshold', 0):
+            # оценка занижена: по ней всего одна страница
+            paginator = EstimatedCountPaginator(queryset, 2)
+            self.assertEqual(paginator.num_pages, 1)
+            self.assertTrue(paginator.page(1).has_next())
+
+            paginator = EstimatedCountPaginator(queryset, 2)
+            page = paginator.page(3)
+            self.assertEqual([product.name for product in page], ['Товар 4'])
+            self.assertFalse(page.has_next())
+            self.assertEqual(paginator.count, 5)
+
+            paginator = EstimatedCountPaginator(queryset, 2)
+            with self.assertRaises(EmptyPage):
+                paginator.page(10)
+            self.assertEqual(paginator.num_pages, 3)
+            self.assertEqual(paginator.get_page(10).number, 3)
+
+    def test_small_or_unsupported_tables_are_counted_exactly(self):
+        Product.objects.create(name='Чай', category=self.category)
+        self.assertEqual(EstimatedCountPaginator(Product.objects.all(), 100).count, 1)
+
+    def test_materials_views_range_filter(self):
+        Material.objects.create(title='Новый', body='текст', views_count=0)
+        Material.objects.create(title='Популярный', body='текст', views_count=5000)
+        response = self.client.get(reverse('admin:materials_material_changelist'), {'views': '1000-9999'})
+        self.assertEqual([material.title for material in response.context['cl'].result_list], ['Популярный'])
+
+    def test_search_keeps_rank_ordering(self):
+        for name in ('Чай чёрный', 'Чай зелёный', 'Кофе'):
+            Product.objects.create(name=name, category=self.category)
+        url = reverse('admin:catalog_product_changelist')
+        # На SQLite релевантности нет: подменяем поиск сортировкой по названию
+        with mock.patch.object(ProductAdmin, 'search_function',
+                               staticmethod(lambda query, queryset: queryset.filter(name__contains=query)
+                                            .order_by('name'))):
+            response = self.client.get(url, {'q': 'Чай'})
+            self.assertEqual([product.name for product in response.context['cl'].result_list],
+                             ['Чай зелёный', 'Чай чёрный'])
+            # Выбранный столбец сортировки важнее релевантности
+            response = self.client.get(url, {'q': 'Чай', 'o': '-2'})
+            self.assertEqual([product.name for product in response.context['cl'].result_list],
+                             ['Чай чёрный', 'Чай зелёный'])
+
+
+class SharedCachesTestCase(TestCase):
+
+    @override_settings(DEBUG=False)
+    def test_local_caches_are_rejected_outside_debug(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_caches()
+        shared = {alias: {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}
+                  for alias in settings.SHARED_CACHES}
+        with self.settings(CACHES=shared):
+            check_shared_caches()
@@ -0,0 +1,77 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# расширение файла -> формат Pillow
+RENDITION_FORMATS = {
+    'webp': 'WEBP',
+    'jpg': 'JPEG',
+}
+
+# Отправляется из фонового потока, когда копии созданы: sender — модель,
+# pk — запись, для изображения которой они заказаны
+renditions_created = Signal()
+
+# Pillow освобождает GIL на время декодирования и ресайза, поэтому потоков достаточно
+_executor = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+
+
+def rendition_name(name, size, fmt='jpg'):
+    """Имя уменьшенной копии рядом с оригиналом: img/meats.jpg -> img/meats.320.jpg"""
+    root, _ = os.path.splitext(str(name))
+    return f'{root}.{size}.{fmt}'
+
+
+def has_renditions(name):
+    return all(
+        default_storage.exists(rendition_name(name, size, fmt))
+        for size in settings.THUMBNAIL_SIZES for fmt in RENDITION_FORMATS
+    )
+
+
+def delete_renditions(name):
+    for size in settings.THUMBNAIL_SIZES:
+        for fmt in RENDITION_FORMATS:
+            default_storage.delete(rendition_name(name, size, fmt))
+
+
+def generate_renditions(name):
+    """Создаёт квадратные копии изображения всех размеров в WebP и JPEG"""
+    with Image.open(default_storage.path(name)) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    for size in settings.THUMBNAIL_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        for fmt, pillow_format in RENDITION_FORMATS.items():
+            path = default_storage.path(rendition_name(name, size, fmt))
+            # Пишем во временный файл и подменяем атомарно: страница не увидит недописанный файл
+            tmp_path = f'{path}.tmp'
+            thumbnail.save(tmp_path, pillow_format, quality=settings.THUMBNAIL_QUALITY, optimize=True)
+            os.replace(tmp_path, path)
+
+
+def _generate_safely(name, sender=None, pk=None):
+    try:
+        generate_renditions(name)
+        renditions_created.send(sender=sender, pk=pk, name=name)
+    except Exception:
+        logger.exception('Не удалось создать уменьшенные копии для %s', name)
+    finally:
+        # Поток пула живёт долго: соединение, открытое получателями сигнала, не держим
+        connection.close()
+
+
+def schedule_renditions(field_file):
+    """Ставит генерацию копий в фоновый пул после фиксации транзакции"""
+    if not field_file or has_renditions(field_file.name):
+        return
+    name = field_file.name
+    sender, pk = type(field_file.instance), field_file.instance.pk
+    transaction.on_commit(lambda: _executor.submit(_generate_safely, name, sender, pk))
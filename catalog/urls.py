@@ -2,8 +2,10 @@ from django.urls import path
 
 from catalog.views import ProductListView, ContactsView, ProductDetailView, \
     CategoryCreateView, ProductCreateView, CategoryListView,  CategoryUpdateView, CategoryDeleteView, \
-    ProductUpdateView, ProductDeleteView, CategoryDetailView
+    ProductUpdateView, ProductDeleteView, CategoryDetailView, ProductSearchView, ProductBulkUpdateView
 
+from catalog.views_async import AsyncProductListView, AsyncProductDetailView, AsyncCategoryListView, \
+    AsyncCategoryDetailView
 from catalog.apps import CatalogConfig
 
 app_name = CatalogConfig.name
@@ -14,10 +16,17 @@ urlpatterns = [
     path('edit_product/<int:pk>', ProductUpdateView.as_view(), name='edit_product'),
     path('view_product/<int:pk>', ProductDetailView.as_view(), name='view_product'),
     path('delete_product/<int:pk>', ProductDeleteView.as_view(), name='delete_product'),
+    path('bulk_product/', ProductBulkUpdateView.as_view(), name='bulk_product'),
     path('list_category/', CategoryListView.as_view(), name='list_category'),
     path('create_category/', CategoryCreateView.as_view(), name='create_category'),
     path('edit_category/<int:pk>', CategoryUpdateView.as_view(), name='edit_category'),
     path('view_category/<int:pk>', CategoryDetailView.as_view(), name='view_category'),
     path('delete_category/<int:pk>', CategoryDeleteView.as_view(), name='delete_category'),
     path('contacts/',ContactsView.as_view(), name='contacts'),
+    path('search/', ProductSearchView.as_view(), name='search'),
+    # Асинхронные варианты страниц только для чтения (для запуска под ASGI)
+    path('async/', AsyncProductListView.as_view(), name='async_list_product'),
+    path('async/view_product/<int:pk>', AsyncProductDetailView.as_view(), name='async_view_product'),
+    path('async/list_category/', AsyncCategoryListView.as_view(), name='async_list_category'),
+    path('async/view_category/<int:pk>', AsyncCategoryDetailView.as_view(), name='async_view_category'),
 ]
\ No newline at end of file
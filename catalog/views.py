@@ -1,12 +1,53 @@
+from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.forms import inlineformset_factory
-from django.http import Http404
-from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.shortcuts import redirect
 from django.urls import reverse_lazy, reverse
+from django.views import View
 from django.views.generic import DetailView, CreateView, TemplateView, ListView, UpdateView, DeleteView
 
-from catalog.forms import ProductForm, CategoryForm, VersionForm, VersionCategoryForm, ProductModeratorForm
-from catalog.models import Product, Category, Contacts, Version, VersionCategory
+from catalog.forms import ProductForm, CategoryForm, ProductModeratorForm, ContactForm, VersionFormSet, \
+    VersionCategoryFormSet, ProductBulkForm
+from catalog.mixins import ConditionalDetailMixin
+from catalog.models import Product, Category
+from catalog.paginators import KeysetPaginator
+from catalog.services import PRODUCT_BULK_ACTIONS, SET_PUBLICATION_PERM, bulk_update_products, client_ip, \
+    contact_rate_limited, save_contact, save_version_formset, search_products
+from users.backends import user_in_group
+
+
+class VersionFormsetMixin:
+    """
+    Формсет версий для страницы редактирования: строится один раз за запрос
+    и сохраняется вместе с основной формой в одной транзакции
+    """
+    formset_class = None
+
+    def get_formset(self):
+        if not hasattr(self, '_formset'):
+            if self.request.method == 'POST':
+                self._formset = self.formset_class(self.request.POST, instance=self.object)
+            else:
+                self._formset = self.formset_class(instance=self.object)
+        return self._formset
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('formset', self.get_formset())
+        return super().get_context_data(**kwargs)
+
+    def form_valid(self, form):
+        formset = self.get_formset()
+        if not formset.is_valid():
+            return self.form_invalid(form)
+        with transaction.atomic():
+            self.object = form.save()
+            formset.instance = self.object
+            save_version_formset(formset)
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class ProductListView(ListView):
@@ -15,6 +56,13 @@ class ProductListView(ListView):
         'title': 'Главная страница',
     }
     template_name = 'catalog/product_list.html'
+    paginate_by = 12
+    # Сессия, пользователь, товары; ещё три — при первой загрузке прав в кэш
+    query_budget = {'queries': 6}
+    # Поля, которые реально выводятся в карточке товара
+    card_fields = ('name', 'description', 'image', 'is_active', 'date_created', 'date_modified',
+                   'category__name', 'category__date_modified',
+                   'current_version__version_number', 'current_version__version_name')
 
     def get_object(self, queryset=None):
         self.object = super().get_object(queryset)
@@ -26,12 +74,44 @@ class ProductListView(ListView):
         # QuerySet — это набор объектов из базы данных, который
         # может использовать фильтры для ограничения результатов
         queryset = super().get_queryset(*args, **kwargs)
-        queryset = queryset.filter(is_active=True)
-        return queryset
+        # Текущая версия денормализована в Product.current_version и приходит тем же JOIN
+        return queryset.filter(is_active=True).select_related('category', 'current_version').only(
+            *self.card_fields
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        # Курсорная пагинация вместо OFFSET: скорость не зависит от номера страницы
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get('cursor'), self.request.GET.get('before'))
+        return paginator, page, page.object_list, page.has_next() or page.has_previous()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['products'] = Product.objects.all()
+        context['card_cache_timeout'] = settings.PRODUCT_CARD_CACHE_TIMEOUT
+        return context
+
+
+class ProductSearchView(ListView):
+    """Полнотекстовый поиск по товарам"""
+    model = Product
+    extra_context = {
+        'title': 'Поиск',
+    }
+    template_name = 'catalog/product_search.html'
+    paginate_by = 12
+
+    def get_queryset(self, *args, **kwargs):
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
+            return Product.objects.none()
+        queryset = Product.objects.filter(is_active=True).select_related('category', 'current_version').only(
+            *ProductListView.card_fields
+        )
+        return search_products(self.query, queryset)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
         return context
 
 
@@ -55,43 +135,26 @@ class ProductCreateView(CreateView):
         return super().form_valid(form)
 
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalDetailMixin, DetailView):
     model = Product
+    # На странице выводится название категории
+    modified_fields = ('date_modified', 'category__date_modified')
     extra_context = {
         'title': 'Товар',
     }
     template_name = 'catalog/product_detail.html'
 
 
-class ProductUpdateView(LoginRequiredMixin, UpdateView, PermissionRequiredMixin):
+class ProductUpdateView(LoginRequiredMixin, VersionFormsetMixin, UpdateView, PermissionRequiredMixin):
     model = Product
     form_class = ProductForm
+    formset_class = VersionFormSet
     permission_required = 'catalog.change_product'
     success_url = reverse_lazy('catalog:list_product')
 
     # def get_success_url(self):
     #     return reverse_lazy('product', kwargs={'pk': self.object.pk})
 
-    def get_context_data(self, **kwargs):
-        context_data = super().get_context_data(**kwargs)
-        VersionFormset = inlineformset_factory(Product, Version, form=VersionForm, extra=1)
-        if self.request.method == 'POST':
-            context_data['formset'] = VersionFormset(self.request.POST, instance=self.object)
-        else:
-            context_data['formset'] = VersionFormset(instance=self.object)
-
-        return context_data
-
-    def form_valid(self, form):
-        formset = self.get_context_data()['formset']
-        self.object = form.save()
-        if formset.is_valid():
-            formset.instance = self.object
-            formset.save()
-        return super().form_valid(form)
-
-
-
     def test_func(self):
         _user = self.request.user
         _instance: Product = self.get_object()
@@ -103,7 +166,7 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView, PermissionRequiredMixin)
 
         if _user == _instance.user:
             return True
-        elif _user.groups.filter(name='moder') and _user.has_perms(custom_perms):
+        elif user_in_group(_user, 'moder') and _user.has_perms(custom_perms):
             return True
         return self.handle_no_permission()
 
@@ -145,23 +208,44 @@ class ProductDeleteView(DeleteView):
         raise PermissionError('Недостаточно прав для удаления данного продукта')
 
 
-def toggle_active(request, slug):
-    products = get_object_or_404(Product, slug=slug)
-    if products.to_publish:
-        products.to_publish = False
-    else:
-        products.to_publish = True
-    products.save()
-    return redirect('catalog:base', slug=products.slug)
+@permission_required(SET_PUBLICATION_PERM, raise_exception=True)
+def toggle_active(request, pk):
+    updated = bulk_update_products(
+        Product.objects.filter(pk=pk),
+        is_published=Case(When(is_published=True, then=Value(False)), default=Value(True)),
+    )
+    if not updated:
+        raise Http404
+    return redirect('catalog:view_product', pk=pk)
+
+
+class ProductBulkUpdateView(LoginRequiredMixin, View):
+    """
+    Массовое действие с товарами одним запросом (см. ProductBulkForm):
+    POST action=publish&category=3 публикует заново всю категорию.
+    Отвечает {"updated": число товаров}
+    """
+
+    def post(self, request):
+        form = ProductBulkForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        permission, _ = PRODUCT_BULK_ACTIONS[form.cleaned_data['action']]
+        if not request.user.has_perm(permission):
+            raise PermissionDenied
+        return JsonResponse({'updated': bulk_update_products(form.get_queryset(), **form.get_values())})
 
 
 class CategoryListView(ListView):
     """Главная старница со списком товаров"""
     model = Category
+    queryset = Category.objects.select_related('current_version')
     extra_context = {
         'title': 'Категории',
     }
     template_name = 'catalog/category_list.html'
+    # Сессия, пользователь и категории с текущими версиями
+    query_budget = {'queries': 3}
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -178,7 +262,7 @@ class CategoryCreateView(CreateView):
     #     return reverse_lazy('catalog:category_list', kwargs={'pk': self.object.pk})
 
 
-class CategoryDetailView(DetailView):
+class CategoryDetailView(ConditionalDetailMixin, DetailView):
     model = Category
     extra_context = {
         'title': 'Категория',
@@ -186,29 +270,12 @@ class CategoryDetailView(DetailView):
     template_name = 'catalog/category_detail.html'
 
 
-class CategoryUpdateView(UpdateView):
+class CategoryUpdateView(VersionFormsetMixin, UpdateView):
     model = Category
     form_class = CategoryForm
+    formset_class = VersionCategoryFormSet
     success_url = reverse_lazy('catalog:list_category')
 
-    def form_valid(self, form):
-        formset = self.get_context_data()['formset']
-        self.object = form.save()
-        if formset.is_valid():
-            formset.instance = self.object
-            formset.save()
-        return super().form_valid(form)
-
-    def get_context_data(self, **kwargs):
-        context_data = super().get_context_data(**kwargs)
-        VersionCategoryFormset = inlineformset_factory(Category, VersionCategory, form=VersionCategoryForm, extra=1)
-        if self.request.method == 'POST':
-            context_data['formset'] = VersionCategoryFormset(self.request.POST, instance=self.object)
-        else:
-            context_data['formset'] = VersionCategoryFormset(instance=self.object)
-
-        return context_data
-
 
 class CategoryDeleteView(DeleteView):
     model = Category
@@ -232,16 +299,17 @@ class ContactsView(TemplateView):
     template_name = 'catalog/contacts.html'
     extra_context = {
         'title': 'Контакты',
-        # 'contacts': Contacts.objects.get(name='Данила'),
     }
 
     def post(self, request, *args, **kwargs):
         # POST — это запрос, который используется для отправки данных
         # на сервер. Обычно он содержит в своём теле данные, которые
         # предполагается сохранить
-        name = request.POST.get('name')
-        phone = request.POST.get('phone')
-        message = request.POST.get('message')
-        print(f'name: {name}, phone: {phone}, message: {message}')
-        return render(request, 'catalog/contacts.html', self.extra_context, {'contacts': Contacts.objects.get(pk=1)})
+        form = ContactForm(request.POST)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(form=form), status=400)
+        if contact_rate_limited(form.cleaned_data['phone'], client_ip(request)):
+            return self.render_to_response(self.get_context_data(form=form, rate_limited=True), status=429)
+        save_contact(**form.cleaned_data)
+        return self.render_to_response(self.get_context_data(contacts=form.instance))
 
@@ -0,0 +1,66 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import render
+from django.views import View
+
+from catalog.models import Category, Product
+from catalog.paginators import KeysetPaginator
+from catalog.views import ProductListView
+
+# Шаблон рендерится в потоке: теги perms и user обращаются к синхронному ORM
+arender = sync_to_async(render)
+
+
+class AsyncProductListView(View):
+    """Асинхронный вариант ProductListView для запуска под ASGI"""
+    template_name = 'catalog/product_list.html'
+    paginate_by = ProductListView.paginate_by
+
+    async def get(self, request, *args, **kwargs):
+        queryset = Product.objects.filter(is_active=True).select_related('category', 'current_version').only(
+            *ProductListView.card_fields
+        )
+        paginator = KeysetPaginator(queryset, self.paginate_by)
+        page = await paginator.apage(request.GET.get('cursor'), request.GET.get('before'))
+        return await arender(request, self.template_name, {
+            'title': 'Главная страница',
+            'object_list': page.object_list,
+            'page_obj': page,
+            'paginator': paginator,
+            'is_paginated': page.has_next() or page.has_previous(),
+            'card_cache_timeout': settings.PRODUCT_CARD_CACHE_TIMEOUT,
+        })
+
+
+class AsyncProductDetailView(View):
+    """Асинхронный вариант ProductDetailView"""
+    template_name = 'catalog/product_detail.html'
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            product = await Product.objects.select_related('category').aget(pk=pk)
+        except Product.DoesNotExist:
+            raise Http404('Товар не найден')
+        return await arender(request, self.template_name, {'title': 'Товар', 'object': product})
+
+
+class AsyncCategoryListView(View):
+    """Асинхронный вариант CategoryListView"""
+    template_name = 'catalog/category_list.html'
+
+    async def get(self, request, *args, **kwargs):
+        categories = [category async for category in Category.objects.select_related('current_version')]
+        return await arender(request, self.template_name, {'title': 'Категории', 'object_list': categories})
+
+
+class AsyncCategoryDetailView(View):
+    """Асинхронный вариант CategoryDetailView"""
+    template_name = 'catalog/category_detail.html'
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            category = await Category.objects.aget(pk=pk)
+        except Category.DoesNotExist:
+            raise Http404('Категория не найдена')
+        return await arender(request, self.template_name, {'title': 'Категория', 'object': category})
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Ограничение времени SQL-запроса только для веб-процессов (см. STATEMENT_TIMEOUT_MS)
+os.environ.setdefault("DJANGO_STATEMENT_TIMEOUT_MS", "5000")
 
 application = get_asgi_application()
@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import sys
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -36,7 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
+    "catalog.staticfiles.StaticFilesConfig",
 
     "catalog",
     "materials",
@@ -46,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "catalog.staticfiles.StaticFilesMiddleware",
+    "catalog.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,6 +58,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "catalog.middleware.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -86,10 +92,120 @@ DATABASES = {
         "USER": "postgres",
         "PASSWORD": "1234",
         "HOST": "127.0.0.1",
-        "PORT": 5432
+        "PORT": 5432,
+        "OPTIONS": {},
     }
 }
 
+# Зависший запрос не должен держать веб-воркер и соединение дольше 5 секунд.
+# Значение задают config/wsgi.py и config/asgi.py, поэтому migrate и команды
+# manage.py (импорт каталога, заполнение данных) работают без ограничения
+STATEMENT_TIMEOUT_MS = int(os.environ.get("DJANGO_STATEMENT_TIMEOUT_MS", 0))
+
+# Для локальных замеров без PostgreSQL: DJANGO_DB=sqlite переключает проект на файл db.sqlite3
+if os.environ.get("DJANGO_DB") == "sqlite":
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("DJANGO_SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+    }
+
+# С psycopg 3 и psycopg_pool соединения берутся из пула (Django 5.1+);
+# на psycopg2 соединение переиспользуется между запросами одного воркера.
+# Постоянные соединения без пула включает только config/wsgi.py: под ASGI
+# каждый запрос идёт в своём потоке, и соединение потока никогда не переиспользуется
+CONN_MAX_AGE = int(os.environ.get("DJANGO_CONN_MAX_AGE", 0))
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    if STATEMENT_TIMEOUT_MS:
+        DATABASES["default"]["OPTIONS"]["options"] = f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"
+    if find_spec("psycopg") and find_spec("psycopg_pool"):
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": 2,
+            "max_size": 10,
+            "timeout": 10,
+            "max_idle": 300,
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = CONN_MAX_AGE
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Бюджет запросов к БД на один HTTP-запрос: при превышении в DEBUG и в тестах
+# запрос завершается ошибкой. Представления задают свой бюджет атрибутом query_budget
+QUERY_BUDGET_ENABLED = DEBUG or "test" in sys.argv
+QUERY_BUDGET = {"queries": 50, "time_ms": 1000}
+
+# Гистограммы времени ответа, SQL и размера ответа по представлениям,
+# отдаются в формате Prometheus по адресу /metrics с заголовком
+# Authorization: Bearer <METRICS_TOKEN>; без токена адрес отвечает 404
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get("DJANGO_METRICS_TOKEN", "")
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "prava-dostupa",
+    },
+    # Счётчики просмотров и ограничения частоты не должны вытесняться раньше времени
+    "counters": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "prava-dostupa-counters",
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 100_000},
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "prava-dostupa-sessions",
+        "OPTIONS": {"MAX_ENTRIES": 100_000},
+    },
+}
+
+# LocMem у каждого процесса свой: версии прав, сессии с отложенной записью,
+# счётчики просмотров и ограничения частоты при нескольких воркерах должны
+# лежать в общем кэше. REDIS_URL=redis://127.0.0.1:6379/0 переводит на Redis
+# все алиасы; при DEBUG = False запуск с LocMem в SHARED_CACHES прерывается
+# (см. catalog.apps.check_shared_caches)
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        alias: {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": alias,
+            "TIMEOUT": options.get("TIMEOUT", 300),
+        }
+        for alias, options in CACHES.items()
+    }
+SHARED_CACHES = ["default", "sessions", "counters"]
+
+# Время жизни закэшированной карточки товара на главной странице (секунды)
+PRODUCT_CARD_CACHE_TIMEOUT = 60 * 15
+
+# Размер пачки UPDATE при массовых действиях с товарами
+PRODUCT_BULK_CHUNK_SIZE = 1000
+
+# Кэш готовых страниц товаров, категорий и материалов для анонимных пользователей
+DETAIL_RESPONSE_CACHE = "default"
+DETAIL_RESPONSE_CACHE_TIMEOUT = 60 * 15
+
+# Буферизация просмотров материалов: алиас кэша, интервал (секунды)
+# и количество просмотров, после которых буфер переносится в БД
+MATERIAL_VIEWS_CACHE = "counters"
+MATERIAL_VIEWS_FLUSH_INTERVAL = 30
+MATERIAL_VIEWS_FLUSH_THRESHOLD = 100
+
+# Обращения из формы контактов: не больше CONTACTS_RATE_LIMIT обращений
+# с одного телефона или IP за CONTACTS_RATE_WINDOW секунд
+CONTACTS_RATE_CACHE = "counters"
+CONTACTS_RATE_LIMIT = 5
+CONTACTS_RATE_WINDOW = 60
+
+# Адреса обратных прокси, которым можно верить в X-Forwarded-For
+# (через запятую в DJANGO_TRUSTED_PROXIES)
+TRUSTED_PROXIES = [address for address in os.environ.get("DJANGO_TRUSTED_PROXIES", "").split(",") if address]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -109,6 +225,34 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Хэширование паролей: DJANGO_PASSWORD_HASHER=pbkdf2|scrypt|argon2 (argon2 — если
+# установлен argon2-cffi). Первый хэшер основной, остальные проверяют старые хэши;
+# при входе Django перехэширует пароль основным хэшером или с новой стоимостью.
+PASSWORD_HASHER_CHOICES = {
+    "pbkdf2": "users.hashers.PBKDF2PasswordHasher",
+    "scrypt": "users.hashers.ScryptPasswordHasher",
+}
+if find_spec("argon2"):
+    PASSWORD_HASHER_CHOICES["argon2"] = "users.hashers.Argon2PasswordHasher"
+PASSWORD_HASHER = os.environ.get("DJANGO_PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CHOICES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER),
+]
+
+# Стоимость хэшей (None — значение Django по умолчанию)
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get("DJANGO_PBKDF2_ITERATIONS", 0)) or None
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get("DJANGO_SCRYPT_WORK_FACTOR", 0)) or None
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("DJANGO_ARGON2_TIME_COST", 0)) or None
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get("DJANGO_ARGON2_MEMORY_COST", 0)) or None
+
+# Сколько хэшей паролей считается одновременно: остальные входы ждут
+# своей очереди и не отнимают процессор у обычных запросов. По умолчанию
+# половина ядер, чтобы волна входов оставляла процессор остальным запросам
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get("DJANGO_PASSWORD_HASH_CONCURRENCY", 0)) or max(
+    1, (os.cpu_count() or 1) // 2
+)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -131,6 +275,11 @@ STATICFILES_DIRS = (
     BASE_DIR / 'static',
 )
 
+# Сюда collectstatic собирает статику с отпечатками и сжатыми копиями .gz/.br;
+# при DEBUG = False её отдаёт catalog.staticfiles.StaticFilesMiddleware
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATIC_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -140,10 +289,41 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Загрузки хранятся один раз под sha256 содержимого (см. catalog.storage)
+STORAGES = {
+    "default": {
+        "BACKEND": "catalog.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "catalog.staticfiles.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Файлы без ссылок удаляет collect_media, если они старше этого срока (секунды)
+MEDIA_GC_GRACE_PERIOD = 24 * 60 * 60
+
+# Размер LRU-кэша URL медиафайлов и срок кэширования файлов с отпечатком (секунды)
+MEDIA_URL_CACHE_SIZE = 4096
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Уменьшенные копии изображений: размеры (px), качество и число фоновых потоков
+THUMBNAIL_SIZES = (150, 320, 640)
+THUMBNAIL_QUALITY = 82
+THUMBNAIL_WORKERS = 2
+
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Письма складываются в очередь OutgoingEmail, отправляет их команда send_outbox
+EMAIL_BACKEND = "users.mail.OutboxEmailBackend"
+OUTBOX_DELIVERY_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 60 * 60
+# Сколько секунд письмо числится за воркером; если воркер упал, не записав
+# результат, по истечении срока письмо снова попадает в очередь
+OUTBOX_SENDING_TIMEOUT = 10 * 60
 EMAIL_HOST = 'smtp.yandex.ru'
 EMAIL_PORT = 465
 EMAIL_HOST_USER = 'dan1la.harchenko@yandex.ru'
@@ -155,7 +335,24 @@ SERVER_EMAIL = EMAIL_HOST_USER
 EMAIL_ADMIN = EMAIL_HOST_USER
 
 CRONJOBS = [
-    ('* * * * *', 'funny.services.send_emails')
+    ('* * * * *', 'users.services.send_outbox'),
+    ('* * * * *', 'django.core.management.call_command', ['flush_views']),
+    ('30 3 * * *', 'django.core.management.call_command', ['collect_media']),
 ]
 
 AUTH_USER_MODEL = 'users.User'
+
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedPermissionBackend',
+]
+
+# Кэш прав и групп пользователей между запросами
+PERMISSIONS_CACHE = "default"
+PERMISSIONS_CACHE_TIMEOUT = 60 * 60
+
+# Сессии в кэше с записью в БД не чаще раза в SESSION_DB_FLUSH_INTERVAL секунд
+# (вход, выход и смена пароля пишутся сразу). Без БД вовсе:
+# DJANGO_SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies
+SESSION_ENGINE = os.environ.get("DJANGO_SESSION_ENGINE", "users.sessions")
+SESSION_CACHE_ALIAS = "sessions"
+SESSION_DB_FLUSH_INTERVAL = 60
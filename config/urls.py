@@ -19,10 +19,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from catalog.media import serve_media
+from catalog.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include('catalog.urls', namespace='catalog')),
     path('materials/', include('materials.urls', namespace='materials')),
     path('users/', include('users.urls', namespace='users')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('metrics', metrics_view, name='metrics'),
+] + static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
 
@@ -12,5 +12,9 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Ограничение времени SQL-запроса только для веб-процессов (см. STATEMENT_TIMEOUT_MS)
+os.environ.setdefault("DJANGO_STATEMENT_TIMEOUT_MS", "5000")
+# Постоянные соединения к БД (если нет пула psycopg 3), под ASGI их не включаем
+os.environ.setdefault("DJANGO_CONN_MAX_AGE", "60")
 
 application = get_wsgi_application()
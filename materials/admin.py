@@ -1,10 +1,44 @@
+from catalog.admin import RankedSearchMixin
+from catalog.paginators import EstimatedCountPaginator
 from materials.models import Material
+from materials.services import search_materials
 from django.contrib import admin
 
 
+class ViewsCountFilter(admin.SimpleListFilter):
+    """
+    Диапазоны просмотров вместо списка всех различных значений views_count:
+    тот строил варианты SELECT DISTINCT по всей таблице при каждой загрузке
+    """
+    title = 'Просмотры'
+    parameter_name = 'views'
+    # Значение параметра -> (подпись, нижняя граница, верхняя граница или None)
+    ranges = {
+        '0': ('Нет просмотров', 0, 0),
+        '1-99': ('1–99', 1, 99),
+        '100-999': ('100–999', 100, 999),
+        '1000-9999': ('1 000–9 999', 1000, 9999),
+        '10000-': ('10 000 и больше', 10000, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(value, label) for value, (label, _, _) in self.ranges.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.ranges:
+            return queryset
+        _, low, high = self.ranges[self.value()]
+        queryset = queryset.filter(views_count__gte=low)
+        return queryset if high is None else queryset.filter(views_count__lte=high)
+
+
 # Register your models here.
 @admin.register(Material)
-class MaterialsAdmin(admin.ModelAdmin):
+class MaterialsAdmin(RankedSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'title', 'is_published', 'views_count',)
-    list_filter = ('is_published', 'views_count',)
+    list_filter = ('is_published', ViewsCountFilter,)
     search_fields = ('title', 'body',)
+    # Без COUNT(*) по всей таблице на каждую загрузку списка
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    search_function = staticmethod(search_materials)
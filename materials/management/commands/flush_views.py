@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from materials.services import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Переносит накопленные в кэше просмотры материалов в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        flushed = view_counter.flush_all(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Перенесено просмотров: {flushed}')
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:11
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Вектор собирается триггером, поэтому он актуален и при bulk_create/update()
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION materials_material_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.body, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER materials_material_search_vector_update_trigger
+    BEFORE INSERT OR UPDATE OF title, body ON materials_material
+    FOR EACH ROW EXECUTE PROCEDURE materials_material_search_vector_update();
+
+UPDATE materials_material SET title = title;
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS materials_material_search_vector_update_trigger ON materials_material;
+DROP FUNCTION IF EXISTS materials_material_search_vector_update();
+"""
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="material",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="material",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="materials_search_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0002_material_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["is_published", "-created_at"],
+                name="materials_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                fields=["-views_count"], name="materials_views_count_idx"
+            ),
+        ),
+    ]
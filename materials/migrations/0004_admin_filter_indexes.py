@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0003_material_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                fields=["is_published", "-id"], name="materials_admin_published_idx"
+            ),
+        ),
+    ]
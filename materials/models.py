@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 NULLABLE = {'null': True, 'blank': True}
@@ -12,10 +14,22 @@ class Material(models.Model):
     views_count = models.IntegerField(default=0, verbose_name='Просмотры')
     is_published = models.BooleanField(default=True, verbose_name='Опубликовано')
     slug = models.CharField(max_length=150, verbose_name='slug', **NULLABLE)
+    # Заполняется триггером PostgreSQL из title и body
+    search_vector = SearchVectorField(editable=False, **NULLABLE)
 
     def __str__(self):
         return self.title
 
     class Meta:
         verbose_name = 'материал'
-        verbose_name_plural = 'материалы'
\ No newline at end of file
+        verbose_name_plural = 'материалы'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='materials_search_idx'),
+            # Список опубликованных материалов, новые сверху
+            models.Index(fields=['is_published', '-created_at'], condition=models.Q(is_published=True),
+                         name='materials_published_idx'),
+            # Сортировка "самые просматриваемые"
+            models.Index(fields=['-views_count'], name='materials_views_count_idx'),
+            # Фильтр is_published в админке с сортировкой по убыванию id
+            models.Index(fields=['is_published', '-id'], name='materials_admin_published_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,173 @@
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import F, Q
+
+from catalog.services import SEARCH_CONFIG
+from materials.models import Material
+
+
+class MaterialViewCounter:
+    """
+    Буферизованный счётчик просмотров материалов.
+
+    Просмотр только увеличивает счётчик в кэше (incr атомарен), а в БД
+    просмотры переносятся пачками запросами вида
+    UPDATE ... SET views_count = views_count + n. Запись строки целиком через
+    save() на каждый просмотр больше не нужна.
+
+    Первый просмотр материала после сброса записывает его pk в журнал в том
+    же кэше, поэтому flush из любого процесса (и команда flush_views)
+    переносит только изменившиеся материалы. Кэш должен быть общим для всех
+    воркеров (см. SHARED_CACHES).
+    """
+    key_prefix = 'material_views'
+    # Пока метка жива, pk повторно в журнал не пишется; если запись журнала
+    # потерялась (вытеснение), материал попадёт в него снова после истечения
+    dirty_timeout = 60 * 60
+
+    def __init__(self, cache_alias='default', flush_interval=30, flush_threshold=100):
+        self.cache_alias = cache_alias
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._flushed_at = time.monotonic()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, pk):
+        return f'{self.key_prefix}:{pk}'
+
+    def _incr(self, key, delta=1):
+        self.cache.add(key, 0, timeout=None)
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # ключ успели вытеснить между add и incr
+            self.cache.set(key, delta, timeout=None)
+            return delta
+
+    def _mark_dirty(self, pk):
+        if self.cache.add(f'{self.key_prefix}:dirty:{pk}', 1, timeout=self.dirty_timeout):
+            number = self._incr(f'{self.key_prefix}:log_seq')
+            self.cache.set(f'{self.key_prefix}:log:{number}', pk, timeout=None)
+
+    def _take_dirty(self, limit):
+        """Забирает из журнала до limit записей, возвращает pk и признак, что журнал исчерпан"""
+        seq = self.cache.get(f'{self.key_prefix}:log_seq', 0)
+        cursor = self.cache.get(f'{self.key_prefix}:log_cursor', 0)
+        if cursor > seq:
+            # номер журнала вытеснили, и нумерация началась заново
+            cursor = 0
+        last = min(seq, cursor + limit)
+        keys = [f'{self.key_prefix}:log:{number}' for number in range(cursor + 1, last + 1)]
+        pks = set(self.cache.get_many(keys).values()) if keys else set()
+        self.cache.set(f'{self.key_prefix}:log_cursor', last, timeout=None)
+        self.cache.delete_many(keys)
+        # Метки снимаются до чтения счётчиков: просмотр во время сброса
+        # снова запишет pk в журнал и не потеряется
+        self.cache.delete_many([f'{self.key_prefix}:dirty:{pk}' for pk in pks])
+        return pks, last == seq
+
+    def hit(self, pk):
+        """Учитывает один просмотр материала"""
+        self._incr(self.make_key(pk))
+        self._mark_dirty(pk)
+
+        with self._lock:
+            self._hits += 1
+            flush_due = (self._hits >= self.flush_threshold
+                         or time.monotonic() - self._flushed_at >= self.flush_interval)
+        if flush_due:
+            self.flush()
+
+    def pending(self, pk):
+        """Количество просмотров, ещё не перенесённых в БД"""
+        return self.cache.get(self.make_key(pk), 0)
+
+    def flush(self, pks=None, chunk_size=1000):
+        """
+        Переносит в БД просмотры материалов pks (по умолчанию — очередной
+        пачки из журнала), возвращает количество перенесённых просмотров
+        """
+        with self._lock:
+            self._hits = 0
+            self._flushed_at = time.monotonic()
+        if pks is None:
+            pks, _ = self._take_dirty(chunk_size)
+        if not pks:
+            return 0
+
+        counts = self.cache.get_many([self.make_key(pk) for pk in pks])
+        claimed = defaultdict(list)
+        for pk in pks:
+            key = self.make_key(pk)
+            count = counts.get(key)
+            if not count:
+                continue
+            # Сначала "забираем" просмотры из кэша: если тот же счётчик
+            # параллельно сбрасывает другой процесс, значение уйдёт в минус
+            # и мы вернём его обратно, не посчитав просмотры дважды.
+            try:
+                left = self.cache.decr(key, count)
+            except ValueError:
+                continue
+            if left < 0:
+                self.cache.incr(key, count)
+                continue
+            claimed[count].append(pk)
+
+        flushed = 0
+        try:
+            with transaction.atomic():
+                for count, ids in claimed.items():
+                    Material.objects.filter(pk__in=ids).update(views_count=F('views_count') + count)
+                    flushed += count * len(ids)
+        except Exception:
+            # Возвращаем просмотры в буфер, чтобы перенести их при следующем сбросе
+            for count, ids in claimed.items():
+                for pk in ids:
+                    self._incr(self.make_key(pk), count)
+                    self._mark_dirty(pk)
+            raise
+        return flushed
+
+    def flush_all(self, chunk_size=1000):
+        """Переносит в БД все просмотры из журнала, в том числе накопленные другими процессами"""
+        flushed = 0
+        exhausted = False
+        while not exhausted:
+            pks, exhausted = self._take_dirty(chunk_size)
+            flushed += self.flush(pks)
+        return flushed
+
+
+view_counter = MaterialViewCounter(
+    cache_alias=settings.MATERIAL_VIEWS_CACHE,
+    flush_interval=settings.MATERIAL_VIEWS_FLUSH_INTERVAL,
+    flush_threshold=settings.MATERIAL_VIEWS_FLUSH_THRESHOLD,
+)
+
+# При штатной остановке воркера переносим в БД всё, что осталось в буфере
+atexit.register(view_counter.flush_all)
+
+
+def search_materials(query, queryset=None):
+    """Полнотекстовый поиск материалов, на SQLite — поиск по вхождению подстроки"""
+    if queryset is None:
+        queryset = Material.objects.all()
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+        ).order_by('-rank', '-id')
+    return queryset.filter(Q(title__icontains=query) | Q(body__icontains=query)).order_by('-id')
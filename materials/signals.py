@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from catalog.thumbnails import schedule_renditions
+from materials.models import Material
+
+
+@receiver(post_save, sender=Material)
+def make_image_renditions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'image' in update_fields:
+        schedule_renditions(instance.image)
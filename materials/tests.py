@@ -1,3 +1,143 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from materials.models import Material
+from materials.services import MaterialViewCounter, view_counter
+from materials.views import MaterialUpdateView
+
+
+class MaterialViewCounterTestCase(TestCase):
+
+    def setUp(self):
+        caches[view_counter.cache_alias].clear()
+        caches['default'].clear()
+        self.material = Material.objects.create(title='Статья', body='Текст')
+
+    def tearDown(self):
+        view_counter.flush()
+
+    def test_views_are_buffered(self):
+        date_modified = self.material.date_modified
+        url = reverse('materials:view_material', args=[self.material.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.context['object'].views_count, 1)
+        # повторные просмотры отдаются из кэша страниц, но тоже учитываются
+        for _ in range(2):
+            self.client.get(url)
+        self.assertEqual(view_counter.pending(self.material.pk), 3)
+
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.views_count, 0)
+
+        self.assertEqual(view_counter.flush(), 3)
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.views_count, 3)
+        self.assertEqual(self.material.date_modified, date_modified)
+        self.assertEqual(view_counter.pending(self.material.pk), 0)
+
+    def test_flush_command(self):
+        view_counter.hit(self.material.pk)
+        view_counter.hit(self.material.pk)
+        call_command('flush_views', stdout=StringIO())
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.views_count, 2)
+
+    def test_repeated_flush_does_not_double_count(self):
+        view_counter.hit(self.material.pk)
+        self.assertEqual(view_counter.flush([self.material.pk]), 1)
+        self.assertEqual(view_counter.flush([self.material.pk]), 0)
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.views_count, 1)
+
+    def test_flush_takes_only_dirty_materials(self):
+        other = Material.objects.create(title='Другая', body='Текст')
+        view_counter.hit(self.material.pk)
+        view_counter.hit(other.pk)
+        view_counter.hit(other.pk)
+        # SAVEPOINT, по одному UPDATE на каждое количество просмотров, RELEASE:
+        # без перебора pk всех материалов
+        with self.assertNumQueries(4):
+            call_command('flush_views', stdout=StringIO())
+        other.refresh_from_db()
+        self.assertEqual(other.views_count, 2)
+        self.assertEqual(view_counter.flush_all(), 0)
+
+        # после сброса материал снова попадает в журнал
+        view_counter.hit(self.material.pk)
+        self.assertEqual(view_counter.flush(), 1)
+
+    def test_flush_from_another_process(self):
+        view_counter.hit(self.material.pk)
+        # другой процесс: свой экземпляр счётчика поверх того же кэша
+        other_process = MaterialViewCounter(cache_alias=view_counter.cache_alias)
+        self.assertEqual(other_process.flush(), 1)
+        self.assertEqual(view_counter.flush(), 0)
+
+    def test_edit_keeps_flushed_views(self):
+        stale = Material.objects.get(pk=self.material.pk)
+        Material.objects.filter(pk=self.material.pk).update(views_count=10)
+        view = MaterialUpdateView()
+        view.setup(RequestFactory().post('/'), pk=self.material.pk)
+        view.object = stale
+        form = view.get_form_class()(data={'title': 'Новое', 'body': 'Текст'}, instance=stale)
+        self.assertTrue(form.is_valid())
+        view.form_valid(form)
+        self.material.refresh_from_db()
+        self.assertEqual((self.material.title, self.material.views_count), ('Новое', 10))
+
+
+class MaterialListViewTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(25):
+            Material.objects.create(title=f'Статья {number}', body='Очень длинный текст' * 100,
+                                    views_count=number % 7)
+        Material.objects.create(title='Черновик', body='Текст', is_published=False, views_count=100)
+
+    def test_paginated_without_body(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('materials:list_material'))
+        materials = response.context['object_list']
+        self.assertEqual(len(materials), 20)
+        self.assertEqual(response.context['paginator'].count, 25)
+        self.assertIn('body', materials[0].get_deferred_fields())
+
+    def test_most_viewed_ordering(self):
+        response = self.client.get(reverse('materials:list_material'), {'order': 'popular'})
+        views = [material.views_count for material in response.context['object_list']]
+        self.assertEqual(views, sorted(views, reverse=True))
+        self.assertNotIn('Черновик', [material.title for material in response.context['object_list']])
+
+    def test_search(self):
+        response = self.client.get(reverse('materials:list_material'), {'q': 'Статья 1'})
+        titles = [material.title for material in response.context['object_list']]
+        self.assertEqual(titles, ['Статья 19', 'Статья 18', 'Статья 17', 'Статья 16', 'Статья 15',
+                                  'Статья 14', 'Статья 13', 'Статья 12', 'Статья 11', 'Статья 10', 'Статья 1'])
+        self.assertIsNone(response.context['order'])
+        self.assertContains(response, 'value="Статья 1"')
+        response = self.client.get(reverse('materials:list_material'), {'q': 'Черновик'})
+        self.assertContains(response, 'ничего не найдено')
+
+
+class AsyncMaterialViewsTestCase(TestCase):
+
+    def setUp(self):
+        caches[view_counter.cache_alias].clear()
+        self.material = Material.objects.create(title='Статья', body='Текст')
+
+    def tearDown(self):
+        view_counter.flush()
+
+    async def test_list_and_detail(self):
+        response = await self.async_client.get(reverse('materials:async_list_material'), {'order': 'popular'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 1)
+
+        response = await self.async_client.get(reverse('materials:async_view_material', args=[self.material.pk]))
+        self.assertEqual(response.context['object'].views_count, 1)
+        self.assertEqual(view_counter.pending(self.material.pk), 1)
@@ -4,6 +4,7 @@ from materials.apps import MaterialsConfig
 from catalog.views import ProductListView, ProductDetailView
 from materials.views import MaterialCreateView, MaterialListView, MaterialDetailView, MaterialUpdateView, \
     MaterialDeleteView, toggle_active
+from materials.views_async import AsyncMaterialListView, AsyncMaterialDetailView
 
 app_name = MaterialsConfig.name
 
@@ -13,5 +14,7 @@ urlpatterns = [
     path('view_material/<int:pk>/', MaterialDetailView.as_view(), name='view_material'),
     path('edit_material/<int:pk>/', MaterialUpdateView.as_view(), name='edit_material'),
     path('delete_material/<int:pk>/', MaterialDeleteView.as_view(), name='delete_material'),
-    path('to_published/<slug>', toggle_active, name='toggle_active')
+    path('to_published/<slug>', toggle_active, name='toggle_active'),
+    path('async/', AsyncMaterialListView.as_view(), name='async_list_material'),
+    path('async/view_material/<int:pk>/', AsyncMaterialDetailView.as_view(), name='async_view_material'),
 ]
\ No newline at end of file
@@ -1,22 +1,22 @@
+from django.http import HttpResponseRedirect
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 from django.views.generic import CreateView, ListView, DetailView, UpdateView, DeleteView
 from pytils.translit import slugify
 
+from catalog.mixins import ConditionalDetailMixin
 from materials.models import Material
+from materials.services import search_materials, view_counter
 
 
 class MaterialCreateView(CreateView):
     model = Material
     fields = ('title', 'body',)
-    success_url = reverse_lazy('materials:list')
+    success_url = reverse_lazy('materials:list_material')
 
     def form_valid(self, form):
-        if form.is_valid():
-            new_mat = form.save()
-            new_mat.slug = slugify(new_mat.title)
-            new_mat.save()
-
+        # slug заполняется до вставки: одна запись в БД вместо INSERT и полного UPDATE
+        form.instance.slug = slugify(form.instance.title)
         return super().form_valid(form)
 
 
@@ -25,21 +25,56 @@ class MaterialListView(ListView):
     extra_context = {
         'title': 'Материалы',
     }
+    paginate_by = 20
+    # Обе сортировки обслуживаются индексами из Material.Meta.indexes
+    orderings = {
+        'new': ('-created_at', '-id'),
+        'popular': ('-views_count', '-id'),
+    }
+
+    @classmethod
+    def list_queryset(cls, params):
+        """
+        Опубликованные материалы для списка, запрос поиска и порядок сортировки.
+        С запросом ?q= материалы сортируются по релевантности (search_materials)
+        """
+        # В списке выводится только заголовок: тяжёлое поле body не загружаем
+        queryset = Material.objects.filter(is_published=True).only('title', 'slug', 'created_at', 'views_count')
+        query = params.get('q', '').strip()
+        if query:
+            return search_materials(query, queryset), query, None
+        order = params.get('order')
+        if order not in cls.orderings:
+            order = 'new'
+        return queryset.order_by(*cls.orderings[order]), query, order
 
     def get_queryset(self, *args, **kwargs):
-        queryset = super().get_queryset(*args, **kwargs)
-        queryset = queryset.filter(is_published=True)
+        queryset, self.query, self.order = self.list_queryset(self.request.GET)
         return queryset
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        context['order'] = self.order
+        return context
 
-class MaterialDetailView(DetailView):
+
+class MaterialDetailView(ConditionalDetailMixin, DetailView):
     model = Material
     success_url = reverse_lazy('materials:list')
 
+    def get(self, request, *args, **kwargs):
+        # Просмотр учитывается и тогда, когда страница отдана из кэша или ответом 304;
+        # сам счётчик на закэшированной странице обновится при изменении материала
+        validators = self.get_validators()
+        if validators is not None:
+            view_counter.hit(validators[0])
+        return super().get(request, *args, **kwargs)
+
     def get_object(self, queryset=None):
         self.object = super().get_object(queryset)
-        self.object.views_count += 1
-        self.object.save()
+        # Часть просмотров ещё в буфере: показываем актуальное значение без записи в БД
+        self.object.views_count += view_counter.pending(self.object.pk)
         return self.object
 
 
@@ -50,15 +85,15 @@ class MaterialUpdateView(UpdateView):
     # success_url = reverse_lazy('materials:list')
 
     def form_valid(self, form):
-        if form.is_valid():
-            new_mat = form.save()
-            new_mat.slug = slugify(new_mat.title)
-            new_mat.save()
-
-        return super().form_valid(form)
+        # Только поля формы: полный save() записал бы views_count, прочитанный
+        # до очередного переноса просмотров (flush_views), и затёр бы их
+        self.object = form.save(commit=False)
+        self.object.slug = slugify(self.object.title)
+        self.object.save(update_fields=[*form.fields, 'slug', 'date_modified'])
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
-        return reverse('materials:view', args=[self.kwargs.get('slug')])
+        return reverse('materials:view_material', args=[self.object.pk])
 
 
 class MaterialDeleteView(DeleteView):
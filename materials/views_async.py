@@ -0,0 +1,43 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.views import View
+
+from catalog.paginators import apaginate
+from catalog.views_async import arender
+from materials.models import Material
+from materials.services import view_counter
+from materials.views import MaterialListView
+
+
+class AsyncMaterialListView(View):
+    """Асинхронный вариант MaterialListView для запуска под ASGI"""
+    template_name = 'materials/material_list.html'
+    paginate_by = MaterialListView.paginate_by
+
+    async def get(self, request, *args, **kwargs):
+        queryset, query, order = MaterialListView.list_queryset(request.GET)
+        paginator, page = await apaginate(queryset, self.paginate_by, request.GET.get('page'))
+        return await arender(request, self.template_name, {
+            'title': 'Материалы',
+            'object_list': page.object_list,
+            'page_obj': page,
+            'paginator': paginator,
+            'is_paginated': page.has_other_pages(),
+            'query': query,
+            'order': order,
+        })
+
+
+class AsyncMaterialDetailView(View):
+    """Асинхронный вариант MaterialDetailView"""
+    template_name = 'materials/material_detail.html'
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            material = await Material.objects.aget(pk=pk)
+        except Material.DoesNotExist:
+            raise Http404('Материал не найден')
+        # hit может сбросить буфер просмотров в БД, поэтому тоже в потоке
+        await sync_to_async(view_counter.hit)(material.pk)
+        material.views_count += view_counter.pending(material.pk)
+        return await arender(request, self.template_name, {'object': material})
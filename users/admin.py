@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from users.models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at',)
+    list_filter = ('status',)
@@ -0,0 +1,116 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from users.hashers import hashing_slot
+
+PERMISSIONS_CACHE_PREFIX = 'auth_perms'
+USER_CACHE_PREFIX = 'auth_user'
+GLOBAL_VERSION = 'global'
+
+
+def _version_key(scope):
+    return f'{PERMISSIONS_CACHE_PREFIX}:version:{scope}'
+
+
+def _bump_version(scope):
+    # Метка времени вместо счётчика: после вытеснения ключа версия не повторится
+    caches[settings.PERMISSIONS_CACHE].set(_version_key(scope), time.time_ns(), None)
+
+
+def invalidate_user_permissions(user_pk):
+    """Сбрасывает закэшированные права и группы одного пользователя"""
+    _bump_version(user_pk)
+
+
+def invalidate_all_permissions():
+    """Сбрасывает закэшированные права всех пользователей (изменились права группы)"""
+    _bump_version(GLOBAL_VERSION)
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    ModelBackend, который хранит права и группы пользователя в кэше между запросами.
+
+    Запись в кэше привязана к версии пользователя и общей версии, которые
+    меняются сигналами при изменении групп и прав (см. users.signals).
+    Пользователь сессии тоже берётся из кэша по версии пользователя: её
+    меняет и сохранение или удаление User. Версии лежат в общем кэше
+    (см. SHARED_CACHES), поэтому изменение видят все воркеры.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        # ModelBackend.authenticate, но очередь hashing_slot занимает только
+        # вычисление хэша: поиск пользователя в БД идёт без неё
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Хэш всё равно считается, чтобы время ответа не выдавало несуществующих пользователей
+            with hashing_slot():
+                UserModel().set_password(password)
+            return None
+        with hashing_slot():
+            password_valid = user.check_password(password)
+        if password_valid and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        cache = caches[settings.PERMISSIONS_CACHE]
+        key = f'{USER_CACHE_PREFIX}:{user_id}:{cache.get(_version_key(user_id), 0)}'
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.PERMISSIONS_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    def get_cached_permissions(self, user_obj):
+        if not hasattr(user_obj, '_cached_permissions'):
+            cache = caches[settings.PERMISSIONS_CACHE]
+            user_version, global_version = _version_key(user_obj.pk), _version_key(GLOBAL_VERSION)
+            versions = cache.get_many([user_version, global_version])
+            key = (f'{PERMISSIONS_CACHE_PREFIX}:{user_obj.pk}:'
+                   f'{versions.get(user_version, 0)}:{versions.get(global_version, 0)}')
+            data = cache.get(key)
+            if data is None:
+                data = {
+                    'user': super().get_user_permissions(user_obj),
+                    'group': super().get_group_permissions(user_obj),
+                    'groups': set(user_obj.groups.values_list('name', flat=True)),
+                }
+                cache.set(key, data, settings.PERMISSIONS_CACHE_TIMEOUT)
+            user_obj._cached_permissions = data
+        return user_obj._cached_permissions
+
+    def _is_cacheable(self, user_obj, obj):
+        return user_obj.is_active and not user_obj.is_anonymous and obj is None
+
+    def get_user_permissions(self, user_obj, obj=None):
+        if not self._is_cacheable(user_obj, obj):
+            return super().get_user_permissions(user_obj, obj)
+        return self.get_cached_permissions(user_obj)['user']
+
+    def get_group_permissions(self, user_obj, obj=None):
+        if not self._is_cacheable(user_obj, obj):
+            return super().get_group_permissions(user_obj, obj)
+        return self.get_cached_permissions(user_obj)['group']
+
+    def get_group_names(self, user_obj):
+        if not self._is_cacheable(user_obj, None):
+            return set()
+        return self.get_cached_permissions(user_obj)['groups']
+
+
+def user_in_group(user, group_name):
+    """Проверяет членство в группе через кэш прав, без запроса к БД"""
+    return group_name in CachedPermissionBackend().get_group_names(user)
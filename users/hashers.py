@@ -0,0 +1,52 @@
+import threading
+from contextlib import contextmanager
+from functools import cache
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Хэшеры Django со стоимостью из настроек. Имена алгоритмов не меняются,
+# поэтому старые хэши проверяются, а при входе с устаревшей стоимостью
+# must_update заставляет Django перехэшировать пароль.
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS or super().iterations
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR or super().work_factor
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST or super().time_cost
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST or super().memory_cost
+
+
+@cache
+def _semaphore(size):
+    return threading.BoundedSemaphore(size)
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Не больше PASSWORD_HASH_CONCURRENCY одновременных вычислений хэша.
+
+    hashlib и argon2 отпускают GIL, поэтому без ограничения волна входов
+    занимает все ядра и обычные запросы ждут процессор.
+    """
+    with _semaphore(settings.PASSWORD_HASH_CONCURRENCY):
+        yield
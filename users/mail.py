@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from users.models import OutgoingEmail
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Почтовый бэкенд, который не отправляет письма, а складывает их в таблицу
+    OutgoingEmail. Отправкой занимается воркер send_outbox, поэтому запрос
+    (например, сброс пароля) не ждёт соединения с SMTP-сервером.
+
+    Письма, которые таблица не может сохранить без потерь (вложения и т. п.,
+    см. OutgoingEmail.can_store), отправляются сразу через
+    OUTBOX_DELIVERY_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        messages = [message for message in email_messages if message.recipients()]
+        emails = [OutgoingEmail.from_message(message) for message in messages if OutgoingEmail.can_store(message)]
+        OutgoingEmail.objects.bulk_create(emails)
+        direct = [message for message in messages if not OutgoingEmail.can_store(message)]
+        if not direct:
+            return len(emails)
+        connection = get_connection(settings.OUTBOX_DELIVERY_BACKEND, fail_silently=self.fail_silently)
+        return len(emails) + (connection.send_messages(direct) or 0)
@@ -0,0 +1,49 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.test import override_settings
+
+from users.hashers import hashing_slot
+from users.models import User
+
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Измеряет число проверок пароля при входе в секунду для каждого хэшера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', nargs='+', choices=list(settings.PASSWORD_HASHER_CHOICES),
+                            default=list(settings.PASSWORD_HASHER_CHOICES))
+        parser.add_argument('--logins', type=int, default=20, help='проверок пароля на поток')
+        parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        if options['logins'] < 1 or options['threads'] < 1:
+            raise CommandError('--logins и --threads должны быть положительными')
+        cores = min(options['threads'], os.cpu_count() or 1)
+
+        threads_title = f'{options["threads"]} потоков, вх/с'
+        self.stdout.write(f'{"хэшер":<8} {"1 поток, вх/с":>14} {threads_title:>18} {"на ядро, вх/с":>14}')
+        for name in options['hashers']:
+            with override_settings(PASSWORD_HASHERS=[settings.PASSWORD_HASHER_CHOICES[name]]):
+                # Пользователь не сохраняется: меряется проверка пароля, а не запрос к БД
+                user = User(email='bench-login@example.com')
+                user.set_password(PASSWORD)
+                single = self.rate(user, options['logins'], 1)
+                parallel = self.rate(user, options['logins'], options['threads'])
+            self.stdout.write(f'{name:<8} {single:>14.1f} {parallel:>18.1f} {parallel / cores:>14.1f}')
+
+    def rate(self, user, logins, threads):
+        def login(_):
+            with hashing_slot():
+                if not user.check_password(PASSWORD):
+                    raise CommandError('Пароль не прошёл проверку')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(login, range(logins * threads)))
+        return logins * threads / (time.perf_counter() - started)
@@ -0,0 +1,37 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Удаляет просроченные сессии пачками по индексу expire_date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='пауза между пачками, секунды (снижает нагрузку на БД)')
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            raise CommandError(f'{settings.SESSION_ENGINE} не хранит сессии в БД')
+        session_model = store.get_model_class()
+
+        now = timezone.now()
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            keys = list(
+                session_model.objects.filter(expire_date__lt=now)
+                .order_by('expire_date').values_list('pk', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            total += session_model.objects.filter(pk__in=keys).delete()[0]
+            if len(keys) < batch_size:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(f'Удалено сессий: {total}')
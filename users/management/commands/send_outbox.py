@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from users.services import send_outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutgoingEmail'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='работать постоянно, опрашивая очередь')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='пауза между опросами пустой очереди, секунды')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            sent = send_outbox(batch_size=options['batch_size'])
+            total += sent
+            if sent:
+                self.stdout.write(f'Отправлено писем: {sent}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Всего отправлено: {total}')
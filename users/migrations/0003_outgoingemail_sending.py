@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_outgoingemail"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="outgoingemail",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "В очереди"),
+                    ("sending", "Отправляется"),
+                    ("sent", "Отправлено"),
+                    ("failed", "Ошибка"),
+                ],
+                default="queued",
+                max_length=10,
+                verbose_name="Статус",
+            ),
+        ),
+    ]
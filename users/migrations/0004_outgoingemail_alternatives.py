@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:19
+
+from django.db import migrations, models
+
+
+def move_html_body(apps, schema_editor):
+    OutgoingEmail = apps.get_model('users', 'OutgoingEmail')
+    for email in OutgoingEmail.objects.exclude(html_body__isnull=True).exclude(html_body='').only('html_body'):
+        email.alternatives = [[email.html_body, 'text/html']]
+        email.save(update_fields=['alternatives'])
+
+
+def restore_html_body(apps, schema_editor):
+    OutgoingEmail = apps.get_model('users', 'OutgoingEmail')
+    for email in OutgoingEmail.objects.only('alternatives'):
+        if not email.alternatives:
+            continue
+        email.html_body = next((content for content, mimetype in email.alternatives if mimetype == 'text/html'), None)
+        email.save(update_fields=['html_body'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_outgoingemail_sending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outgoingemail",
+            name="alternatives",
+            field=models.JSONField(
+                blank=True, default=list, verbose_name="Альтернативные части"
+            ),
+        ),
+        migrations.AddField(
+            model_name="outgoingemail",
+            name="reply_to",
+            field=models.JSONField(blank=True, default=list, verbose_name="Ответ на"),
+        ),
+        migrations.RunPython(move_html_body, restore_html_body),
+        migrations.RemoveField(
+            model_name="outgoingemail",
+            name="html_body",
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
+from django.utils import timezone
 
 from catalog.models import NULLABLE
 
@@ -16,4 +18,83 @@ class User(AbstractUser):
     REQUIRED_FIELDS = []
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (см. users.mail и команду send_outbox)"""
+    STATUS_QUEUED = 'queued'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_SENDING, 'Отправляется'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_FAILED, 'Ошибка'),
+    )
+
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    # Альтернативные части письма (например, HTML): список пар [содержимое, mimetype]
+    alternatives = models.JSONField(default=list, blank=True, verbose_name='Альтернативные части')
+    from_email = models.CharField(max_length=255, verbose_name='Отправитель')
+    to = models.JSONField(default=list, verbose_name='Получатели')
+    cc = models.JSONField(default=list, blank=True, verbose_name='Копия')
+    bcc = models.JSONField(default=list, blank=True, verbose_name='Скрытая копия')
+    reply_to = models.JSONField(default=list, blank=True, verbose_name='Ответ на')
+    headers = models.JSONField(default=dict, blank=True, verbose_name='Заголовки')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='Следующая попытка')
+    sent_at = models.DateTimeField(**NULLABLE, verbose_name='Отправлено')
+    last_error = models.TextField(**NULLABLE, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.to)}'
+
+    @staticmethod
+    def can_store(message):
+        """
+        Можно ли сохранить письмо без потерь: вложения, нестрочные альтернативные
+        части, текст не в text/plain и особая кодировка в таблице не хранятся
+        """
+        return (
+            not message.attachments
+            and message.content_subtype == 'plain'
+            and message.encoding is None
+            and all(isinstance(content, str) for content, _ in getattr(message, 'alternatives', []))
+        )
+
+    @classmethod
+    def from_message(cls, message):
+        if not cls.can_store(message):
+            raise ValueError('Письмо нельзя поставить в очередь без потери содержимого')
+        return cls(
+            subject=message.subject,
+            body=message.body,
+            alternatives=[[content, mimetype] for content, mimetype in getattr(message, 'alternatives', [])],
+            from_email=message.from_email,
+            to=list(message.to),
+            cc=list(message.cc),
+            bcc=list(message.bcc),
+            reply_to=list(message.reply_to),
+            headers=dict(message.extra_headers),
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(self.subject, self.body, self.from_email, self.to, bcc=self.bcc,
+                                         cc=self.cc, reply_to=self.reply_to, headers=self.headers,
+                                         connection=connection)
+        for content, mimetype in self.alternatives:
+            message.attach_alternative(content, mimetype)
+        return message
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            # Выборка очереди воркером
+            models.Index(fields=['status', 'next_attempt_at'], name='users_outbox_queue_idx'),
+        ]
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import OutgoingEmail
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед повторной попыткой"""
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), settings.OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim_outbox(batch_size):
+    """
+    Забирает пачку писем в короткой транзакции: помечает их STATUS_SENDING,
+    увеличивает attempts и продлевает next_attempt_at на OUTBOX_SENDING_TIMEOUT.
+
+    Строки блокируются с SKIP LOCKED только на время этой транзакции, поэтому
+    несколько воркеров не возьмут одно письмо дважды. Письма, зависшие
+    в STATUS_SENDING дольше срока (воркер упал), забираются снова.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=(OutgoingEmail.STATUS_QUEUED, OutgoingEmail.STATUS_SENDING), next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        claimed, exhausted = [], []
+        for email in emails:
+            if email.status == OutgoingEmail.STATUS_SENDING and email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                exhausted.append(email.pk)
+            else:
+                claimed.append(email)
+        if exhausted:
+            OutgoingEmail.objects.filter(pk__in=exhausted).update(
+                status=OutgoingEmail.STATUS_FAILED, last_error='Воркер не записал результат отправки',
+            )
+        lease_until = now + timedelta(seconds=settings.OUTBOX_SENDING_TIMEOUT)
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in claimed]).update(
+            status=OutgoingEmail.STATUS_SENDING, attempts=F('attempts') + 1, next_attempt_at=lease_until,
+        )
+    for email in claimed:
+        email.attempts += 1
+    return claimed
+
+
+def failure_update(email, exc):
+    """Поля письма после неудачной попытки: повтор с задержкой или отказ после OUTBOX_MAX_ATTEMPTS"""
+    update = {'last_error': f'{type(exc).__name__}: {exc}'}
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        update['status'] = OutgoingEmail.STATUS_FAILED
+    else:
+        update['status'] = OutgoingEmail.STATUS_QUEUED
+        update['next_attempt_at'] = timezone.now() + retry_delay(email.attempts)
+    return update
+
+
+def send_outbox(batch_size=None, connection=None):
+    """
+    Отправляет пачку писем из очереди через одно SMTP-соединение.
+
+    Письма забираются короткой транзакцией (claim_outbox), SMTP-отправка идёт
+    вне транзакции, а результат каждого письма записывается отдельным UPDATE.
+    Если воркер упадёт между отправкой и записью результата, письмо будет
+    отправлено повторно после OUTBOX_SENDING_TIMEOUT (доставка «хотя бы раз»).
+    Если соединение не открылось, вся пачка возвращается в очередь с ошибкой.
+    Возвращает количество отправленных писем.
+    """
+    emails = claim_outbox(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0
+
+    connection = connection or get_connection(settings.OUTBOX_DELIVERY_BACKEND)
+    sent = 0
+    try:
+        connection.open()
+    except Exception as exc:
+        # SMTP-сервер недоступен: ошибка записывается в письма, воркер продолжает работу
+        for email in emails:
+            OutgoingEmail.objects.filter(pk=email.pk, status=OutgoingEmail.STATUS_SENDING).update(
+                **failure_update(email, exc)
+            )
+        return 0
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([email.to_message(connection)])
+            except Exception as exc:
+                update = failure_update(email, exc)
+                # после ошибки соединение может быть в неопределённом состоянии:
+                # следующее письмо откроет его заново
+                connection.close()
+            else:
+                update = {'status': OutgoingEmail.STATUS_SENT, 'sent_at': timezone.now()}
+                sent += 1
+            OutgoingEmail.objects.filter(pk=email.pk, status=OutgoingEmail.STATUS_SENDING).update(**update)
+    finally:
+        connection.close()
+    return sent
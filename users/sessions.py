@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class SessionStore(CachedDBStore):
+    """
+    Сессии в кэше с отложенной записью в БД.
+
+    Сессия читается из кэша, а в django_session попадает не при каждом
+    изменении, а не чаще раза в SESSION_DB_FLUSH_INTERVAL секунд. Создание
+    сессии, вход, выход и смена пароля записываются в БД сразу, поэтому при
+    потере кэша теряются только последние изменения прочих данных сессии.
+    Кэш SESSION_CACHE_ALIAS должен быть общим для всех воркеров
+    (см. SHARED_CACHES).
+    """
+    cache_key_prefix = 'users.sessions'
+
+    @property
+    def flushed_cache_key(self):
+        return f'{self.cache_key}:flushed'
+
+    def _auth_snapshot(self, data):
+        return data.get(SESSION_KEY), data.get(HASH_SESSION_KEY)
+
+    def _db_write_due(self, data):
+        flushed = self._cache.get(self.flushed_cache_key)
+        if flushed is None:
+            return True
+        flushed_at, auth_snapshot = flushed
+        return (auth_snapshot != self._auth_snapshot(data)
+                or time.time() - flushed_at >= settings.SESSION_DB_FLUSH_INTERVAL)
+
+    def save(self, must_create=False):
+        data = self._get_session(no_load=must_create)
+        if must_create or self.session_key is None or self._db_write_due(data):
+            super().save(must_create=must_create)
+            self._cache.set(self.flushed_cache_key, (time.time(), self._auth_snapshot(data)),
+                            self.get_expiry_age())
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        key = session_key or self.session_key
+        super().delete(session_key)
+        if key is not None:
+            self._cache.delete(f'{self.cache_key_prefix}{key}:flushed')
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from catalog.thumbnails import schedule_renditions
+from users.backends import invalidate_all_permissions, invalidate_user_permissions
+from users.models import User
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def reset_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_user_permissions(instance.pk)
+    elif pk_set:
+        for user_pk in pk_set:
+            invalidate_user_permissions(user_pk)
+    else:
+        # group.user_set.clear() и permission.user_set.clear(): затронутые пользователи неизвестны
+        invalidate_all_permissions()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def reset_group_permissions(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_all_permissions()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def reset_permissions_on_delete(sender, **kwargs):
+    invalidate_all_permissions()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_permissions_on_user_change(sender, instance, **kwargs):
+    # is_superuser и is_active меняют права без m2m_changed; версия пользователя
+    # сбрасывает и закэшированный объект пользователя сессии (get_user)
+    invalidate_user_permissions(instance.pk)
+    # Повторно после коммита: параллельный запрос мог успеть закэшировать старую строку
+    transaction.on_commit(lambda: invalidate_user_permissions(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def make_avatar_renditions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'avatar' in update_fields:
+        schedule_renditions(instance.avatar)
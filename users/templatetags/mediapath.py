@@ -1,12 +1,12 @@
 from django import template
 
-from config.settings import MEDIA_URL
+from catalog.media import media_url
 
 register = template.Library()
 
 
 @register.simple_tag
-def mediapath(val):
+def mediapath(val, size=None):
     if val:
-        return f'/media/{val}'
-    return '/media/no_photo.jpg'
+        return media_url(val, size)
+    return media_url('no_photo.jpg')
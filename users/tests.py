@@ -1,3 +1,376 @@
-from django.test import TestCase
+import socket
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import Group, Permission
+from django.core import mail
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.mail import EmailMessage, EmailMultiAlternatives, send_mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.backends import user_in_group
+from users.models import OutgoingEmail, User
+from users.services import send_outbox
+from users.sessions import SessionStore
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+class Sink:
+    """Обработчик aiosmtpd, запоминающий принятые письма и SMTP-сессии"""
+
+    def __init__(self):
+        self.envelopes = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        self.sessions.add(id(session))
+        return '250 OK'
+
+
+class CachedPermissionBackendTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='moder@test.ru')
+        self.group = Group.objects.create(name='moder')
+        self.permission = Permission.objects.get(codename='delete_product')
+        self.group.permissions.add(self.permission)
+        self.user.groups.add(self.group)
+
+    def fresh_user(self):
+        # Новый объект, как в каждом запросе: встроенный _perm_cache пуст
+        return User.objects.get(pk=self.user.pk)
+
+    def test_permission_checks_do_not_hit_database(self):
+        self.assertTrue(self.fresh_user().has_perm('catalog.delete_product'))
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('catalog.delete_product'))
+            self.assertFalse(user.has_perm('catalog.add_product'))
+            self.assertTrue(user_in_group(user, 'moder'))
+
+    def test_group_permissions_change_resets_cache(self):
+        self.assertTrue(self.fresh_user().has_perm('catalog.delete_product'))
+        self.group.permissions.remove(self.permission)
+        self.assertFalse(self.fresh_user().has_perm('catalog.delete_product'))
+
+    def test_user_groups_change_resets_cache(self):
+        self.assertTrue(user_in_group(self.fresh_user(), 'moder'))
+        self.group.user_set.remove(self.user)
+        self.assertFalse(user_in_group(self.fresh_user(), 'moder'))
+
+    def test_user_permissions_change_resets_cache(self):
+        self.assertFalse(self.fresh_user().has_perm('catalog.add_product'))
+        self.user.user_permissions.add(Permission.objects.get(codename='add_product'))
+        self.assertTrue(self.fresh_user().has_perm('catalog.add_product'))
+
+    def test_revoking_superuser_resets_cache(self):
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertIn('catalog.add_product', self.fresh_user().get_all_permissions())
+
+        user = self.fresh_user()
+        user.is_superuser = False
+        user.save()
+        self.assertFalse(self.fresh_user().has_perm('catalog.add_product'))
+        self.assertTrue(self.fresh_user().has_perm('catalog.delete_product'))
+
+    def test_authenticated_page_has_no_permission_queries(self):
+        self.client.force_login(self.user)
+        url = reverse('catalog:list_product')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        permission_queries = [query['sql'] for query in queries.captured_queries
+                              if 'auth_permission' in query['sql'] or 'auth_group' in query['sql']]
+        self.assertEqual(permission_queries, [])
+
+
+class SessionTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['sessions'].clear()
+        self.user = User.objects.create(email='session@test.ru')
+
+    def test_authenticated_request_reads_session_from_cache(self):
+        self.client.force_login(self.user)
+        url = reverse('catalog:list_product')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        session_queries = [query['sql'] for query in queries.captured_queries if 'django_session' in query['sql']]
+        self.assertEqual(session_queries, [])
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [query['sql'] for query in queries.captured_queries if 'FROM "users_user"' in query['sql']]
+
+    def test_session_user_is_cached_until_version_bump(self):
+        self.client.force_login(self.user)
+        url = reverse('catalog:list_product')
+        self.assertEqual(len(self.user_queries(url)), 1)
+        self.assertEqual(self.user_queries(url), [])
+
+        # сохранение пользователя меняет общую версию: объект читается из БД заново
+        self.user.first_name = 'Иван'
+        self.user.save()
+        self.assertEqual(len(self.user_queries(url)), 1)
+        self.assertEqual(self.user_queries(url), [])
+
+    def test_deactivated_user_is_logged_out(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('users:profile'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('users:profile')).status_code, 302)
+
+    def test_session_changes_are_written_behind(self):
+        session = SessionStore()
+        session['step'] = 1
+        session.create()
+        key = session.session_key
+
+        session = SessionStore(key)
+        session['step'] = 2
+        with self.assertNumQueries(0):
+            session.save()
+        self.assertEqual(SessionStore(key)['step'], 2)
+        self.assertEqual(Session.objects.get(pk=key).get_decoded()['step'], 1)
+
+        with override_settings(SESSION_DB_FLUSH_INTERVAL=0):
+            session.save()
+        self.assertEqual(Session.objects.get(pk=key).get_decoded()['step'], 2)
+
+    def test_login_is_written_through(self):
+        self.client.force_login(self.user)
+        key = self.client.session.session_key
+        self.assertEqual(Session.objects.get(pk=key).get_decoded()['_auth_user_id'], str(self.user.pk))
+
+    def test_clear_expired_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{number}', session_data='', expire_date=now - timedelta(days=1))
+             for number in range(5)]
+            + [Session(session_key='alive', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        call_command('clear_expired_sessions', batch_size=2, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list('pk', flat=True)), ['alive'])
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000, PASSWORD_SCRYPT_WORK_FACTOR=2 ** 4)
+class PasswordHasherTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User(email='hash@test.ru')
+
+    def login(self):
+        return self.client.post(reverse('users:login'), {'username': self.user.email, 'password': 'secret'})
+
+    @override_settings(PASSWORD_HASHERS=['users.hashers.PBKDF2PasswordHasher'])
+    def test_iterations_come_from_settings(self):
+        self.user.set_password('secret')
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_rehashes_with_preferred_hasher(self):
+        with self.settings(PASSWORD_HASHERS=['users.hashers.PBKDF2PasswordHasher']):
+            self.user.set_password('secret')
+            self.user.save()
+
+        with self.settings(PASSWORD_HASHERS=['users.hashers.ScryptPasswordHasher',
+                                             'users.hashers.PBKDF2PasswordHasher']):
+            self.assertEqual(self.login().status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+    @override_settings(PASSWORD_HASHERS=['users.hashers.PBKDF2PasswordHasher'])
+    def test_login_rehashes_with_new_cost(self):
+        self.user.set_password('secret')
+        self.user.save()
+
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    @override_settings(PASSWORD_HASHERS=['users.hashers.PBKDF2PasswordHasher'])
+    def test_hashing_slot_covers_only_hashing(self):
+        self.user.set_password('secret')
+        self.user.save()
+        slot_taken = []
+
+        @contextmanager
+        def hashing_slot():
+            slot_taken.append(True)
+            yield
+            slot_taken.pop()
+
+        original_lookup = User.objects.get_by_natural_key
+
+        def get_by_natural_key(username):
+            self.assertEqual(slot_taken, [])
+            return original_lookup(username)
+
+        with mock.patch('users.backends.hashing_slot', hashing_slot), \
+                mock.patch.object(User.objects, 'get_by_natural_key', side_effect=get_by_natural_key):
+            with mock.patch('users.models.User.check_password', autospec=True,
+                            side_effect=lambda user, password: bool(slot_taken)):
+                self.assertEqual(authenticate(username='hash@test.ru', password='secret'), self.user)
+            with mock.patch('users.models.User.set_password', autospec=True,
+                            side_effect=lambda user, password: self.assertEqual(slot_taken, [True])) as set_password:
+                self.assertIsNone(authenticate(username='nobody@test.ru', password='secret'))
+            # для несуществующего пользователя хэш тоже считается, в очереди
+            set_password.assert_called_once()
+
+
+@override_settings(EMAIL_BACKEND='users.mail.OutboxEmailBackend',
+                   OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.ru')
+        self.user.set_password('password')
+        self.user.save()
+
+    def test_password_reset_is_queued(self):
+        response = self.client.post(reverse('users:password_reset'), {'email': 'user@test.ru'})
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.filter(to=['user@test.ru']).count(), 1)
+
+        self.assertEqual(send_outbox(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@test.ru'])
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.STATUS_SENT)
+        self.assertEqual(send_outbox(), 0)
+
+    def test_alternatives_and_reply_to_are_kept(self):
+        message = EmailMultiAlternatives('Тема', 'Текст', 'shop@test.ru', ['user@test.ru'], reply_to=['help@test.ru'])
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach_alternative('Текст', 'text/markdown')
+        message.send()
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(send_outbox(), 1)
+        sent = mail.outbox[0]
+        self.assertEqual(sent.reply_to, ['help@test.ru'])
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html'), ('Текст', 'text/markdown')])
+
+    def test_attachments_are_sent_directly(self):
+        message = EmailMessage('Тема', 'Текст', 'shop@test.ru', ['user@test.ru'])
+        message.attach('price.csv', 'товар;цена', 'text/csv')
+        self.assertEqual(message.send(), 1)
+        self.assertFalse(OutgoingEmail.objects.exists())
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'price.csv')
+        with self.assertRaises(ValueError):
+            OutgoingEmail.from_message(message)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        send_mail('Тема', 'Текст', 'shop@test.ru', ['user@test.ru'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=ConnectionError('нет связи')):
+            self.assertEqual(send_outbox(), 0)
+
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_QUEUED)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('нет связи', email.last_error)
+        # до наступления времени следующей попытки письмо не берётся
+        self.assertEqual(send_outbox(), 0)
+
+    def test_gives_up_after_max_attempts(self):
+        send_mail('Тема', 'Текст', 'shop@test.ru', ['user@test.ru'])
+        OutgoingEmail.objects.update(attempts=4)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=ConnectionError('нет связи')):
+            send_outbox()
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.STATUS_FAILED)
+
+    def test_connection_failure_requeues_batch(self):
+        send_mail('Тема', 'Текст', 'shop@test.ru', ['user@test.ru'])
+        send_mail('Тема', 'Текст', 'shop@test.ru', ['other@test.ru'])
+        connection = mock.Mock()
+        connection.open.side_effect = OSError('SMTP недоступен')
+        self.assertEqual(send_outbox(connection=connection), 0)
+
+        connection.send_messages.assert_not_called()
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (OutgoingEmail.STATUS_QUEUED, 1))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            self.assertEqual(email.last_error, 'OSError: SMTP недоступен')
+
+    def test_smtp_is_called_outside_transaction(self):
+        send_mail('Тема', 'Текст', 'shop@test.ru', ['user@test.ru'])
+        outer_blocks = len(connection.atomic_blocks)
+        statuses = []
+
+        def send_messages(messages):
+            self.assertEqual(len(connection.atomic_blocks), outer_blocks)
+            statuses.append(OutgoingEmail.objects.get().status)
+            return len(messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=send_messages):
+            self.assertEqual(send_outbox(), 1)
+        # письмо уже числится за воркером и недоступно другим
+        self.assertEqual(statuses, [OutgoingEmail.STATUS_SENDING])
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.STATUS_SENT)
+
+    def test_stuck_sending_is_reclaimed_after_timeout(self):
+        send_mail('Тема', 'Текст', 'shop@test.ru', ['user@test.ru'])
+        OutgoingEmail.objects.update(status=OutgoingEmail.STATUS_SENDING, attempts=1,
+                                     next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(send_outbox(), 0)
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_outbox(), 1)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.STATUS_SENT, 2))
+
+
+@skipUnless(Controller, 'aiosmtpd не установлен')
+@override_settings(EMAIL_BACKEND='users.mail.OutboxEmailBackend',
+                   OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                   EMAIL_HOST='127.0.0.1', EMAIL_USE_SSL=False, EMAIL_USE_TLS=False,
+                   EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='')
+class OutboxSMTPTestCase(TestCase):
+    """Отправка через настоящий SMTP-бэкенд на локальный сервер aiosmtpd"""
+
+    def setUp(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.handler = Sink()
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=self.port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+
+    def test_batch_is_sent_over_one_connection(self):
+        for number in range(3):
+            send_mail(f'Письмо {number}', 'Текст', 'shop@test.ru', [f'user{number}@test.ru'])
+
+        with self.settings(EMAIL_PORT=self.port):
+            self.assertEqual(send_outbox(), 3)
+
+        self.assertEqual(len(self.handler.envelopes), 3)
+        self.assertEqual(len(self.handler.sessions), 1)
+        self.assertEqual(sorted(envelope.rcpt_tos[0] for envelope in self.handler.envelopes),
+                         ['user0@test.ru', 'user1@test.ru', 'user2@test.ru'])